@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+import websockets
+
+from call_state import CallStateStore
+from metrics import observe
+
+try:
+    import msgpack
+except ImportError:  # optional, ohne msgpack gibt es nur JSON-Frames
+    msgpack = None
+
+# Puffer pro /client-Verbindung; wer so weit zurückliegt, wird getrennt
+ALERT_BUFFER_SIZE = int(os.getenv("ALERT_BUFFER_SIZE", "100"))
+# Obergrenze für ?batch_ms=..., damit Alerts nicht beliebig lange liegen bleiben
+MAX_BATCH_MS = int(os.getenv("ALERT_MAX_BATCH_MS", "1000"))
+
+
+class Subscription:
+    def __init__(self, call_sid, maxsize):
+        self.call_sid = call_sid  # None = alle Calls
+        self.queue = asyncio.Queue(maxsize)
+        self.evicted = False
+
+
+class AlertBroadcaster:
+    """
+    Verteilt Alerts an alle /client-Verbindungen (Fan-out statt einer
+    gemeinsamen Queue, aus der jeder Client nur einen Teil bekommt).
+
+    Jeder Subscriber hat einen eigenen, begrenzten Puffer und abonniert
+    entweder einen call_sid oder alle Calls. publish() blockiert nie: ist der
+    Puffer eines Subscribers voll, wird er verworfen (evicted) und seine
+    Verbindung geschlossen, damit ein hängender Browser niemanden aufhält.
+
+    state führt den Zustand pro Call mit (CallStateStore); neue Subscriber
+    bekommen daraus zuerst einen Snapshot, danach die Live-Alerts.
+    """
+
+    def __init__(self, buffer_size=ALERT_BUFFER_SIZE, state=None):
+        self.buffer_size = buffer_size
+        self.state = CallStateStore() if state is None else state
+        self._all = set()
+        self._by_call = {}
+        self.published = 0
+        self.evictions = 0
+
+    def subscribe(self, call_sid=None):
+        sub = Subscription(call_sid, self.buffer_size)
+        if call_sid is None:
+            self._all.add(sub)
+        else:
+            self._by_call.setdefault(call_sid, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        if sub.call_sid is None:
+            self._all.discard(sub)
+        else:
+            subs = self._by_call.get(sub.call_sid)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_call[sub.call_sid]
+
+    @property
+    def subscriber_count(self):
+        return len(self._all) + sum(len(subs) for subs in self._by_call.values())
+
+    def publish(self, alert):
+        start = time.perf_counter()
+        self.published += 1
+        self.state.apply(alert)
+        targets = list(self._all)
+        call_subs = self._by_call.get(alert.get("call_sid"))
+        if call_subs:
+            targets.extend(call_subs)
+        for sub in targets:
+            try:
+                sub.queue.put_nowait(alert)
+            except asyncio.QueueFull:
+                self._evict(sub)
+        observe("alert_publish", time.perf_counter() - start)
+
+    def _evict(self, sub):
+        self.evictions += 1
+        sub.evicted = True
+        self.unsubscribe(sub)
+        # Puffer leeren und mit None wecken, damit der Handler die Verbindung schließt
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+
+def encode_frame(frame, encoding="json"):
+    if encoding == "msgpack":
+        return msgpack.packb(frame, use_bin_type=True)
+    return json.dumps(frame)
+
+
+def encode_alerts(alerts, encoding="json"):
+    """
+    Ein Frame für mehrere Alerts: {"event": "batch", "alerts": [...]}.
+    json -> Text-Frame, msgpack -> Binär-Frame mit derselben Struktur.
+    """
+    return encode_frame({"event": "batch", "alerts": alerts}, encoding)
+
+
+def decode_alert_frame(message):
+    """Gegenstück für Python-Clients (loadtest): Frame -> Liste von Alerts."""
+    data = msgpack.unpackb(message, raw=False) if isinstance(message, bytes) else json.loads(message)
+    if data.get("event") == "batch":
+        return data["alerts"]
+    return [data]
+
+
+def _batch_options(params):
+    try:
+        batch_ms = min(max(int(params.get("batch_ms", ["0"])[0]), 0), MAX_BATCH_MS)
+    except ValueError:
+        batch_ms = 0
+    encoding = params.get("encoding", ["json"])[0]
+    if encoding == "msgpack" and msgpack is None:
+        print("msgpack not installed, sending JSON frames")
+        encoding = "json"
+    elif encoding not in ("json", "msgpack"):
+        encoding = "json"
+    return batch_ms, encoding
+
+
+async def client_handler(websocket, broadcaster, query=""):
+    """
+    Handles a /client connection. ?call_sid=... subscribes to one call,
+    without it the client receives alerts for all calls.
+
+    ?batch_ms=N sammelt Alerts bis zu N ms und schickt sie als ein "batch"-Frame
+    (ein send/Syscall statt einem pro Alert), ?encoding=msgpack schickt die
+    Frames binär. Ohne Parameter kommt wie bisher ein JSON-Frame pro Alert.
+    Der erste Frame ist immer ein {"event": "snapshot", "calls": [...]} mit dem
+    aktuellen Zustand (nur des call_sid, falls angegeben).
+    Während des Fensters wird der Subscriber-Puffer laufend in den Batch geleert,
+    ALERT_BUFFER_SIZE begrenzt also nur den Rückstand beim Senden.
+    """
+    params = parse_qs(query)
+    call_sid = params.get("call_sid", [None])[0]
+    batch_ms, encoding = _batch_options(params)
+    sub = broadcaster.subscribe(call_sid)
+    # Direkt nach subscribe() (ohne await dazwischen): kein Alert fehlt oder kommt doppelt
+    snapshot = encode_frame(broadcaster.state.snapshot(call_sid), encoding)
+    print(f"Frontend client connected (call_sid={call_sid or 'all'}, batch_ms={batch_ms}, encoding={encoding})")
+    try:
+        await websocket.send(snapshot)
+        while True:
+            alert = await sub.queue.get()
+            if alert is None:
+                print("Frontend client too slow, disconnecting")
+                await websocket.close(code=1013, reason="slow consumer")
+                break
+            if batch_ms == 0 and encoding == "json":
+                start = time.perf_counter()
+                await websocket.send(json.dumps(alert))
+                observe("alert_send", time.perf_counter() - start)
+                continue
+
+            # Erster Alert startet das Fenster, alles bis zum Ende kommt in denselben Frame.
+            # Der Puffer wird währenddessen laufend geleert, damit er nicht überläuft.
+            alerts = [alert]
+            evicted = False
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + batch_ms / 1000
+            while True:
+                while not sub.queue.empty():
+                    alert = sub.queue.get_nowait()
+                    if alert is None:
+                        evicted = True
+                        break
+                    alerts.append(alert)
+                timeout = deadline - loop.time()
+                if evicted or timeout <= 0:
+                    break
+                try:
+                    alert = await asyncio.wait_for(sub.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if alert is None:
+                    evicted = True
+                    break
+                alerts.append(alert)
+            if evicted:
+                print("Frontend client too slow, disconnecting")
+                await websocket.close(code=1013, reason="slow consumer")
+                break
+            start = time.perf_counter()
+            await websocket.send(encode_alerts(alerts, encoding))
+            observe("alert_send", time.perf_counter() - start)
+    except websockets.exceptions.ConnectionClosed:
+        print("Frontend client disconnected")
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -0,0 +1,108 @@
+"""
+Alert-Bus zwischen mehreren Worker-Prozessen auf demselben Host.
+
+Mit FRAUD_WS_WORKERS=N laufen N Prozesse mit SO_REUSEPORT auf demselben
+Port; der Kernel verteilt die Verbindungen. Ein /client-Dashboard hängt also
+an irgendeinem Worker, der Call mit dem Alert vielleicht an einem anderen.
+
+Jeder Worker bindet einen Unix-Datagram-Socket unter einem festen Pfad
+(<bus_dir>/worker-<i>.sock). publish() verteilt den Alert lokal und schickt
+ihn einmal kodiert per sendto an alle anderen Worker; eingehende Datagramme
+werden im Event-Loop (add_reader) gelesen und nur lokal verteilt. sendto ist
+non-blocking: ist ein Peer nicht erreichbar oder sein Puffer voll, wird der
+Alert für diesen Peer verworfen und gezählt, statt den Call aufzuhalten.
+"""
+import asyncio
+import json
+import os
+import socket
+import tempfile
+
+from alert_broadcaster import AlertBroadcaster
+
+BUS_DIR = os.getenv("FRAUD_BUS_DIR", os.path.join(tempfile.gettempdir(), "fraud-alert-bus"))
+MAX_DATAGRAM = 64 * 1024
+
+
+def worker_socket_path(bus_dir, worker_id):
+    return os.path.join(bus_dir, f"worker-{worker_id}.sock")
+
+
+class AlertBus(AlertBroadcaster):
+    """
+    AlertBroadcaster, der Alerts zusätzlich an die anderen Worker weiterreicht.
+    Muss im Event-Loop des Workers erzeugt werden (start() registriert den Reader).
+    """
+
+    def __init__(self, worker_id, num_workers, bus_dir=BUS_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.worker_id = worker_id
+        self.bus_dir = bus_dir
+        self.peers = [worker_socket_path(bus_dir, i) for i in range(num_workers) if i != worker_id]
+        self.forwarded = 0
+        self.received = 0
+        self.send_errors = 0
+        self._sock = None
+
+    def start(self):
+        os.makedirs(self.bus_dir, exist_ok=True)
+        path = worker_socket_path(self.bus_dir, self.worker_id)
+        try:
+            os.unlink(path)  # Rest eines abgestürzten Workers
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(path)
+        self._sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._on_readable)
+        print(f"Alert bus worker {self.worker_id} listening on {path} ({len(self.peers)} peers)")
+
+    def close(self):
+        if self._sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._sock.fileno())
+        path = self._sock.getsockname()
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def publish(self, alert):
+        super().publish(alert)
+        if self._sock is None or not self.peers:
+            return
+        payload = json.dumps(alert).encode("utf-8")
+        for peer in self.peers:
+            try:
+                self._sock.sendto(payload, peer)
+                self.forwarded += 1
+            except (BlockingIOError, FileNotFoundError, ConnectionRefusedError):
+                # Peer noch nicht gestartet, beendet oder überlastet
+                self.send_errors += 1
+
+    def _on_readable(self):
+        while True:
+            try:
+                payload = self._sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            try:
+                alert = json.loads(payload)
+            except ValueError:
+                continue
+            self.received += 1
+            # Nur lokal verteilen, sonst würden Alerts zwischen den Workern kreisen
+            AlertBroadcaster.publish(self, alert)
+
+    def stats(self):
+        return {
+            "worker": self.worker_id,
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "forwarded": self.forwarded,
+            "received": self.received,
+            "send_errors": self.send_errors,
+            "evictions": self.evictions,
+        }
@@ -1,14 +1,37 @@
 import torch
-import torchaudio
-import numpy as np
 import asyncio
-
-from check_audio_file import check_audio_file
-
-device = "cuda" if torch.cuda.is_available() else "cpu"
-
-# Beispiel: Modell wird aus externem Loader importiert
-from model_loader import get_model
+import math
+import os
+import time
+
+from audio_stats import audio_stats
+from mulaw import decode_mulaw
+from resampler import StreamingResampler, normalize_peak
+from ring_buffer import SlidingWindow
+from score_smoothing import ScoreSmoother
+from vad import VoiceActivityGate
+
+from model_loader import get_model, get_device
+from metrics import observe, timed
+
+device = get_device()  # CPU, wenn das quantisierte Modell aktiv ist
+
+# "window": Peak-Normalisierung über das 2s-Fenster, "chunk": pro 0.4s-Chunk, "none"
+NORMALIZE_MODE = os.getenv("SPOOF_NORMALIZE", "window")
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 2.0  # AASIST erwartet [B, 32000]
+WINDOW_SAMPLES = int(WINDOW_SECONDS * SAMPLE_RATE)
+# Abstand zwischen zwei Fenstern, z.B. 0.5 für 2s-Fenster alle 0.5s
+HOP_SECONDS = float(os.getenv("SPOOF_HOP_SECONDS", str(WINDOW_SECONDS)))
+# Glättung der Scores pro Call: "ema", "max" oder "none"
+SMOOTHING_MODE = os.getenv("SPOOF_SMOOTHING", "none")
+EMA_ALPHA = float(os.getenv("SPOOF_EMA_ALPHA", "0.5"))
+SMOOTHING_WINDOWS = int(os.getenv("SPOOF_SMOOTHING_WINDOWS", "4"))
+# VAD vor dem Modell: nur Sprach-Frames zählen zur Fenstergröße (SPOOF_VAD=0 schaltet ab)
+VAD_ENABLED = os.getenv("SPOOF_VAD", "1") == "1"
+VAD_ENERGY_DB = float(os.getenv("SPOOF_VAD_ENERGY_DB", "-45"))
+VAD_ZCR_MAX = float(os.getenv("SPOOF_VAD_ZCR_MAX", "0.5"))
 
 def load_model():
     model = get_model()
@@ -16,68 +39,194 @@ def load_model():
     model.eval()
     return model
 
-def resample_audio(audio_chunk):
-    audio_np = np.frombuffer(audio_chunk, dtype=np.uint8) - 128
-    audio_tensor = torch.from_numpy(audio_np).float()
-    resampler = torchaudio.transforms.Resample(orig_freq=8000, new_freq=16000)
-    resampled_tensor = resampler(audio_tensor)
-    resampled_tensor = resampled_tensor / torch.max(torch.abs(resampled_tensor) + 1e-9)
-    return resampled_tensor
-
-async def anti_spoofing_worker(audio_queue: asyncio.Queue, spoof_results_queue: asyncio.Queue, model):
+def hop_samples(hop_seconds=None):
+    """Hop in 16kHz-Samples; 0 würde SlidingWindow endlos laufen lassen, mehr als ein Fenster Lücken erzeugen."""
+    hop_seconds = HOP_SECONDS if hop_seconds is None else hop_seconds
+    samples = int(hop_seconds * SAMPLE_RATE)
+    if not 1 <= samples <= WINDOW_SAMPLES:
+        raise ValueError(f"Hop of {hop_seconds}s must be between {1 / SAMPLE_RATE}s and {WINDOW_SECONDS}s")
+    return samples
+
+hop_samples()  # SPOOF_HOP_SECONDS schon beim Import prüfen
+
+def resample_audio(audio_chunk, resampler, vad=None):
+    with timed("resample"):
+        audio_np = decode_mulaw(audio_chunk)  # Twilio liefert G.711 μ-law, 8kHz
+        if vad is not None:
+            audio_np = vad.filter(audio_np)  # Stille / Rauschen gar nicht erst resamplen
+        audio_tensor = torch.from_numpy(audio_np)
+        return resampler.process(audio_tensor)
+
+def extract_scores(output):
+    """
+    Wandelt die Modellausgabe in eine Liste von Scores um (einer pro Batch-Element).
+    AASIST liefert ein Tupel (hidden, logits [B, 2]); Score = Wahrscheinlichkeit für Klasse 0 (Spoof),
+    hoher Score = Spoof (der Server meldet score > 0.8).
+    """
+    if isinstance(output, tuple):
+        logits = output[1]
+        probs = torch.softmax(logits, dim=1)
+        return probs[:, 0].tolist()
+    return output.reshape(-1).tolist()
+
+def score_windows(model, audio_windows):
+    """Synchroner Forward-Pass für [B, 32000]; läuft im Eventloop oder im InferencePool."""
+    with timed("model_forward"), torch.no_grad():
+        return extract_scores(model(audio_windows))
+
+def speech_audio(samples, sample_rate, vad=VAD_ENABLED):
+    """
+    Offline-Vorstufe für ganze Dateien: wie im Live-Pfad erst die VAD (20ms-Frames,
+    SPOOF_VAD_* gelten), dann auf 16kHz resamplen.
+    samples: 1D float32 numpy-Array mit sample_rate.
+    Gibt (1D float32-Tensor mit 16kHz, gate) zurück; gate ist die VoiceActivityGate
+    (oder None) und rechnet Positionen im gefilterten Audio auf die Datei zurück.
+    """
+    gate = None
+    if vad:
+        gate = VoiceActivityGate(frame_samples=sample_rate // 50, energy_db=VAD_ENERGY_DB, zcr_max=VAD_ZCR_MAX)
+        samples = gate.filter(samples)
+    resampler = StreamingResampler(sample_rate, SAMPLE_RATE, "cpu", normalize=NORMALIZE_MODE)
+    audio = torch.cat([resampler.process(torch.from_numpy(samples)), resampler.flush()])
+    return audio[:math.ceil(len(samples) * SAMPLE_RATE / sample_rate)], gate
+
+def iter_windows(audio, sample_rate, gate=None, hop_seconds=None):
+    """
+    Fensterbildung aus anti_spoofing_worker für das Ergebnis von speech_audio().
+    Liefert (View [32000], (start, end) in Datei-Sekunden); die View ist nur bis
+    zum nächsten Schritt gültig und noch nicht normalisiert (siehe copy_window).
+    Speicher bleibt bei einem Fenster, egal wie lang die Datei ist.
+    """
+    windows = SlidingWindow(WINDOW_SAMPLES, hop_samples(hop_seconds))
+    ratio = sample_rate / SAMPLE_RATE
+    for window, start, end in windows.push(audio):
+        if gate is not None:
+            # Sprach-Position -> Datei-Position, wie im Worker
+            span = (gate.stream_offset(int(start * ratio)) / sample_rate,
+                    (gate.stream_offset(int(end * ratio) - 1) + 1) / sample_rate)
+        else:
+            span = (start / SAMPLE_RATE, end / SAMPLE_RATE)
+        yield window, span
+
+def copy_window(window, out):
+    """Fenster wie im Worker normalisiert nach out kopieren (z.B. eine Zeile eines Batch-Puffers)."""
+    if NORMALIZE_MODE == "window":
+        normalize_peak(window, out=out)
+    else:
+        out.copy_(window)
+
+def windows_from_speech(audio, sample_rate, gate=None, hop_seconds=None):
+    """
+    Alle Fenster von iter_windows() auf einmal, für kurze Dateien.
+    Gibt (Tensor [N, 32000] auf der CPU, [(start, end), ...] in Datei-Sekunden) zurück.
+    """
+    hop = hop_samples(hop_seconds)
+    count = (audio.shape[0] - WINDOW_SAMPLES) // hop + 1 if audio.shape[0] >= WINDOW_SAMPLES else 0
+    batch = torch.empty(count, WINDOW_SAMPLES)
+    spans = []
+    for i, (window, span) in enumerate(iter_windows(audio, sample_rate, gate, hop_seconds)):
+        copy_window(window, batch[i])
+        spans.append(span)
+    return batch, spans
+
+def windows_from_audio(samples, sample_rate, hop_seconds=None, vad=VAD_ENABLED):
+    """
+    Offline-Variante der Fensterbildung aus anti_spoofing_worker für ganze Dateien,
+    mit derselben VAD wie live (vad=False bzw. SPOOF_VAD=0 schaltet sie ab).
+    Gibt (Tensor [N, 32000] auf der CPU, [(start, end), ...] in Sekunden) zurück.
+    """
+    audio, gate = speech_audio(samples, sample_rate, vad)
+    return windows_from_speech(audio, sample_rate, gate, hop_seconds)
+
+async def anti_spoofing_worker(audio_queue: asyncio.Queue, spoof_results_queue: asyncio.Queue, model,
+                               scheduler=None, pool=None, hop_seconds=None, smoothing=None):
+    """
+    Bewertet den Stream in Fenstern von WINDOW_SECONDS alle hop_seconds
+    (Default SPOOF_HOP_SECONDS; gleich der Fensterlänge = nicht überlappend)
+    audio_queue liefert (offset, chunk): offset ist die Position des Chunks im
+    Stream in Bytes (= 8kHz-Samples), None beendet den Worker. Fehlen Chunks
+    (z.B. von der Queue verworfen), fängt die Fensterbildung hinter der Lücke
+    neu an, damit kein Fenster zusammengeklebtes Audio enthält und start/end
+    weiter zu ScoreTimeline und CallRecorder passen.
+
+    Legt pro Fenster ein Ergebnis in spoof_results_queue:
+        {"score": geglättet, "raw_score": ..., "start": s, "end": s, "frames_skipped": n,
+         "stats": {"rms", "peak", "clipping_ratio", "dc_offset"}}
+    start/end sind Stream-Sekunden; mit VAD umfasst ein Fenster 2s Sprache,
+    kann im Stream also länger sein.
+
+    scheduler: optionaler InferenceScheduler. Wenn gesetzt, werden die Fenster
+    aller Calls gemeinsam gebatcht, sonst rechnet jeder Call mit Batchgröße 1.
+    pool:      optionaler InferencePool. Wenn gesetzt, laufen Resampling und
+    Inferenz außerhalb des Eventloops.
+    smoothing: "ema" | "max" | "none" (Default SPOOF_SMOOTHING)
+    """
     print("Anti-spoofing worker started.")
-    SPOOFING_WINDOW_SIZE_SAMPLES = 16000 * 2  # 2 Sekunden bei 16kHz
-    spoofing_buffer = []
+    windows = SlidingWindow(WINDOW_SAMPLES, hop_samples(hop_seconds), device)
+    smoother = ScoreSmoother(smoothing or SMOOTHING_MODE, EMA_ALPHA, SMOOTHING_WINDOWS)
+    staging = torch.empty(WINDOW_SAMPLES, device=device)  # wird pro Fenster wiederverwendet
+    resampler = StreamingResampler(8000, SAMPLE_RATE, device, normalize=NORMALIZE_MODE)
+    vad = VoiceActivityGate(energy_db=VAD_ENERGY_DB, zcr_max=VAD_ZCR_MAX) if VAD_ENABLED else None
+    upsample = SAMPLE_RATE // 8000
+    expected_offset = 0
+    gaps = 0
 
     while True:
-        chunk = await audio_queue.get()
-        if chunk is None:
+        item = await audio_queue.get()
+        if item is None:
             break
-
-        resampled_chunk = resample_audio(chunk)
-        spoofing_buffer.append(resampled_chunk)
-
-        current_buffer_size = sum(c.size(0) for c in spoofing_buffer)
-        if current_buffer_size >= SPOOFING_WINDOW_SIZE_SAMPLES:
-
-            print(f"resampled_chunk shape: {resampled_chunk.shape}")
-            print(f"buffer elements shapes before cat: {[c.shape for c in spoofing_buffer]}")
-
-            audio_tensor = torch.cat(spoofing_buffer, dim=0)  # concat 1D Tensor
-
-            print(f"audio_tensor shape after cat: {audio_tensor.shape}")
-
+        offset, chunk = item
+        if offset > expected_offset:
+            gaps += 1
+            resampler.reset()
+            if vad is not None:
+                vad.skip_to(offset)
+                windows.restart(vad.speech_pos * upsample)
+            else:
+                windows.restart(offset * upsample)
+        expected_offset = offset + len(chunk)
+
+        if pool is not None:
+            resampled_chunk = await pool.run(resample_audio, chunk, resampler, vad)
+        else:
+            resampled_chunk = resample_audio(chunk, resampler, vad)
+
+        # View auf den Ringpuffer; bleibt gültig, weil erst nach dem Score weitergeschrieben wird
+        for audio_tensor, start, end in windows.push(resampled_chunk):
+            stats = audio_stats(audio_tensor)  # vor der Normalisierung, damit Pegel/Clipping echt sind
+            audio_tensor = resampler.normalize_window(audio_tensor, out=staging)
             audio_window = audio_tensor.unsqueeze(0)  # Shape: [1, 32000]
-            #audio_window = audio_window.unsqueeze(1)  # Shape: [1, 1, 32000]
-
-            print(f"audio_window shape after unsqueeze: {audio_window.shape}")
-
-
-            with torch.no_grad():
-
-                check_audio_file(audio_window, sr=16000)
 
-                print("Calculating score")
-                print(f"Model device: {next(model.parameters()).device}")
-                output = model(audio_window)
-                print(f"Model output type: {type(output)}")
-                print(f"Model output: {output}")
-                if isinstance(output, tuple):
-                    print(f"Output is a tuple with {len(output)} elements:")
-                    for i, elem in enumerate(output):
-                        print(f"Element {i} type: {type(elem)}, value: {elem}, shape: {elem.shape if hasattr(elem, 'shape') else 'N/A'}")
-                    logits = output[1]  # Zweites Element enthält Logits [1, 2]
-                    print(f"Logits: {logits}")
-                    probs = torch.softmax(logits, dim=1)  # Konvertiere zu Wahrscheinlichkeiten
-                    print(f"Probabilities: {probs}")
-                    score = probs[0, 0].item()  # Wahrscheinlichkeit für Klasse 0 (echt)
-                    print(f"Extracted score (probability for class 0): {score}")
-                else:
-                    score = output.item()
-                    print(f"Extracted score (single tensor): {score}")
-                await spoof_results_queue.put(score)
-            spoofing_buffer = []
+            inference_start = time.perf_counter()
+            if scheduler is not None:
+                raw_score = await scheduler.score(audio_tensor)
+            elif pool is not None:
+                raw_score = (await pool.run(score_windows, model, audio_window))[0]
+            else:
+                raw_score = score_windows(model, audio_window)[0]
+            observe("inference", time.perf_counter() - inference_start)
+
+            if vad is not None:
+                # Sprach-Position -> Stream-Position (VAD rechnet in 8kHz-Samples)
+                start = vad.stream_offset(start // upsample) * upsample
+                end = (vad.stream_offset(end // upsample - 1) + 1) * upsample
+                vad.trim(windows.buffer.total_written // upsample - WINDOW_SAMPLES // upsample)
+
+            result = {
+                "score": smoother.update(raw_score),
+                "raw_score": raw_score,
+                "start": start / SAMPLE_RATE,
+                "end": end / SAMPLE_RATE,
+                "frames_skipped": vad.frames_skipped if vad is not None else 0,
+                "stats": stats,
+            }
+            print(f"Spoof score {result['start']:.1f}-{result['end']:.1f}s: {result['score']:.3f} (raw {raw_score:.3f})")
+            await spoof_results_queue.put(result)
 
 
     audio_queue.task_done()
-    print("Anti-spoofing worker finished.")
\ No newline at end of file
+    if gaps:
+        print(f"Restarted windowing after {gaps} gaps in the audio stream")
+    if vad is not None:
+        print(f"VAD skipped {vad.frames_skipped}/{vad.frames_total} frames")
+    print("Anti-spoofing worker finished.")
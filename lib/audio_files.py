@@ -0,0 +1,83 @@
+import os
+import struct
+
+import numpy as np
+
+from mulaw import decode_mulaw
+
+# Rohes G.711 μ-law ohne Header, wie es Twilio Media Streams liefert
+MULAW_EXTENSIONS = (".ulaw", ".mulaw", ".ul", ".raw")
+AUDIO_EXTENSIONS = MULAW_EXTENSIONS + (".wav",)
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_FLOAT = 3
+_WAVE_FORMAT_MULAW = 7
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def find_audio_files(paths):
+    """Sammelt alle Audiodateien aus Dateien und Ordnern (rekursiv), sortiert."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def read_audio_file(path):
+    """
+    Liest eine Aufnahme als mono float32 in [-1, 1].
+    Unterstützt rohes μ-law (8kHz) und WAV mit PCM 8/16/32 bit, float32 oder μ-law.
+    Gibt (samples, sample_rate) zurück.
+    """
+    if path.lower().endswith(MULAW_EXTENSIONS):
+        with open(path, "rb") as f:
+            return decode_mulaw(f.read()), 8000
+    with open(path, "rb") as f:
+        return _parse_wav(f.read(), path)
+
+
+def _parse_wav(data, path):
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError(f"{path}: not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, pos)
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # Subformat-GUID beginnt mit dem eigentlichen Format-Tag
+                fmt = (struct.unpack_from("<H", data, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError(f"{path}: data chunk before fmt chunk")
+            return _decode_wav_samples(memoryview(data)[body:body + size], fmt, path)
+        pos = body + size + (size & 1)
+    raise ValueError(f"{path}: no data chunk")
+
+
+def _decode_wav_samples(payload, fmt, path):
+    format_tag, channels, sample_rate, _, _, bits = fmt
+    if format_tag == _WAVE_FORMAT_MULAW:
+        samples = decode_mulaw(payload)
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 16:
+        samples = np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32768.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 8:
+        samples = (np.frombuffer(payload, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 32:
+        samples = np.frombuffer(payload, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif format_tag == _WAVE_FORMAT_FLOAT and bits == 32:
+        samples = np.frombuffer(payload, dtype="<f4").astype(np.float32)
+    else:
+        raise ValueError(f"{path}: unsupported WAV format {format_tag} / {bits} bit")
+
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return np.ascontiguousarray(samples, dtype=np.float32), sample_rate
@@ -0,0 +1,27 @@
+import torch
+
+# Ab diesem Betrag gilt ein Sample als übersteuert (Signal in [-1, 1])
+CLIP_LEVEL = 0.99
+
+
+def audio_stats(window, clip_level=CLIP_LEVEL):
+    """
+    Qualitätskennzahlen eines Fensters für den Serving-Pfad: RMS, Peak,
+    Clipping-Anteil und DC-Offset. Nur Tensor-Reduktionen, ein einziger
+    Device-Sync am Ende; ersetzt check_audio_file im Hot Path.
+    """
+    n = window.shape[0]
+    low, high = torch.aminmax(window)
+    clipped = torch.count_nonzero(window.abs() >= clip_level)
+    dc_offset, rms, peak, clipping_ratio = torch.stack([
+        window.sum() / n,
+        torch.sqrt(torch.dot(window, window) / n),
+        torch.maximum(high, -low),
+        clipped / n,
+    ]).tolist()
+    return {
+        "rms": rms,
+        "peak": peak,
+        "clipping_ratio": clipping_ratio,
+        "dc_offset": dc_offset,
+    }
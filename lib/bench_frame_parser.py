@@ -0,0 +1,101 @@
+"""
+Benchmark: Twilio-Frames pro Sekunde auf einem Core, vorher vs. nachher.
+
+"baseline" ist die alte Schleife aus twilio_receiver (json.loads +
+base64.b64decode + inbuffer-Slicing), die anderen Zeilen nutzen
+TwilioFrameDecoder + AudioChunker mit dem jeweiligen Backend.
+
+    python bench_frame_parser.py --frames 200000
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+from chunker import AudioChunker
+from twilio_frames import TwilioFrameDecoder
+
+BUFFER_SIZE = 20 * 160
+FRAMES_PER_CALL_SECOND = 50  # Twilio schickt 20ms-Frames
+
+
+def make_frames(count):
+    frames = []
+    for i in range(count):
+        frames.append(json.dumps({
+            "event": "media",
+            "sequenceNumber": str(i + 2),
+            "media": {
+                "track": "inbound",
+                "chunk": str(i + 1),
+                "timestamp": str(i * 20),
+                "payload": base64.b64encode(os.urandom(160)).decode("ascii"),
+            },
+            "streamSid": "MZ18ad3ab5a668481ce02b83e7395059f0",
+        }, separators=(",", ":")))
+    return frames
+
+
+def run_baseline(frames):
+    inbuffer = bytearray()
+    chunks = 0
+    for message in frames:
+        data = json.loads(message)
+        if data["event"] == "media":
+            media = data["media"]
+            if media["track"] == "inbound":
+                inbuffer.extend(base64.b64decode(media["payload"]))
+        while len(inbuffer) >= BUFFER_SIZE:
+            chunk = bytes(inbuffer[:BUFFER_SIZE])
+            inbuffer = inbuffer[BUFFER_SIZE:]
+            chunks += 1
+    return chunks
+
+
+def run_decoder(frames, decoder):
+    chunker = AudioChunker(BUFFER_SIZE)
+    chunks = 0
+    for message in frames:
+        event, data, audio = decoder.decode(message)
+        if audio is not None:
+            chunks += len(chunker.feed(audio))
+    return chunks
+
+
+def measure(fn, frames, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(frames)
+        best = min(best, time.process_time() - start)
+    return len(frames) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    variants = [("baseline (json + b64decode + slicing)", run_baseline)]
+    for backend in ("json", "ujson", "orjson"):
+        try:
+            decoder = TwilioFrameDecoder(backend=backend, fast_path=False)
+        except ImportError:
+            continue
+        variants.append((f"decoder {backend}", lambda f, d=decoder: run_decoder(f, d)))
+    fast = TwilioFrameDecoder(fast_path=True)
+    variants.append((f"decoder fast-path (fallback {fast.backend})", lambda f: run_decoder(f, fast)))
+
+    baseline = None
+    print(f"{'variant':<42} {'frames/s':>12} {'calls/core':>11} {'speedup':>8}")
+    for name, fn in variants:
+        rate = measure(fn, frames, args.repeat)
+        baseline = baseline or rate
+        print(f"{name:<42} {rate:>12,.0f} {rate / FRAMES_PER_CALL_SECOND:>11,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: Kosten pro Call für verschiedene Hop-Größen des Sliding-Window-Scorings.
+
+Spielt synthetisches μ-law-Audio (8kHz, 0.4s-Chunks wie von twilio_receiver)
+durch anti_spoofing_worker und misst CPU-Zeit pro Sekunde Audio. Die VAD ist
+dabei aus: Rauschen liegt genau an ihrer Zero-Crossing-Schwelle, sonst würde
+teils das Gating statt des Scorings gemessen.
+
+    python bench_hop_sizes.py --seconds 30 --hops 2.0 1.0 0.5 0.25
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ["SPOOF_VAD"] = "0"  # vor dem Import, anti_spoofing liest es beim Laden
+
+from anti_spoofing import load_model, anti_spoofing_worker
+
+CHUNK_BYTES = 20 * 160  # 0.4 Sekunden, wie BUFFER_SIZE in server.py
+
+
+async def run_call(model, seconds, hop_seconds, smoothing):
+    audio_queue = asyncio.Queue()
+    spoof_results_queue = asyncio.Queue()
+    for i in range(int(seconds * 8000) // CHUNK_BYTES):
+        await audio_queue.put((i * CHUNK_BYTES, os.urandom(CHUNK_BYTES)))
+    await audio_queue.put(None)
+
+    await anti_spoofing_worker(audio_queue, spoof_results_queue, model,
+                               hop_seconds=hop_seconds, smoothing=smoothing)
+    return spoof_results_queue.qsize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0, help="Audio-Länge pro simuliertem Call")
+    parser.add_argument("--hops", type=float, nargs="+", default=[2.0, 1.0, 0.5, 0.25])
+    parser.add_argument("--smoothing", default="ema", choices=["ema", "max", "none"])
+    args = parser.parse_args()
+
+    model = load_model()
+    # Warm-up, damit der erste Hop nicht die Allocator-Kosten trägt
+    asyncio.run(run_call(model, 4, 2.0, "none"))
+
+    rows = []
+    for hop in args.hops:
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        windows = asyncio.run(run_call(model, args.seconds, hop, args.smoothing))
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        rows.append((hop, windows, cpu, wall))
+
+    print()
+    print(f"{'hop [s]':>8} {'windows':>8} {'cpu ms / audio s':>17} {'realtime x':>11} {'calls / core':>13}")
+    for hop, windows, cpu, wall in rows:
+        cpu_per_second = cpu / args.seconds
+        print(f"{hop:>8.2f} {windows:>8d} {cpu_per_second * 1000:>17.1f} "
+              f"{args.seconds / wall:>11.1f} {1 / cpu_per_second:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
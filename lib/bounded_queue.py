@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from metrics import observe, register_queue
+
+# Überlauf-Strategien
+DROP_OLDEST = "drop_oldest"  # ältestes Element verwerfen, neues aufnehmen
+SKIP = "skip"                # neues Element verwerfen (z.B. Inferenz für dieses Fenster auslassen)
+BLOCK = "block"              # Backpressure: put() wartet, bis wieder Platz ist
+POLICIES = (DROP_OLDEST, SKIP, BLOCK)
+
+# Defaults für die Queues eines Calls, per Umgebungsvariable einstellbar
+# Audio-Queues zum anti_spoofing_worker tragen (offset, chunk): verworfene Chunks
+# werden dort als Lücke erkannt statt das Audio zusammenzukleben
+AUDIO_QUEUE_SIZE = int(os.getenv("AUDIO_QUEUE_SIZE", "50"))  # 50 * 0.4s = 20s Audio
+RESULTS_QUEUE_SIZE = int(os.getenv("RESULTS_QUEUE_SIZE", "100"))
+OVERFLOW_POLICY = os.getenv("QUEUE_OVERFLOW_POLICY", DROP_OLDEST)
+# Alte Scores sind wertlos, daher standardmäßig die ältesten verwerfen
+RESULTS_OVERFLOW_POLICY = os.getenv("RESULTS_OVERFLOW_POLICY", DROP_OLDEST)
+
+
+def _is_control(item):
+    # End-Signale (None bzw. b'') dürfen nie verloren gehen
+    return item is None or item == b''
+
+
+class BoundedQueue(asyncio.Queue):
+    """
+    asyncio.Queue mit fester Größe und Überlauf-Strategie.
+
+    Verworfene Elemente werden in counters[f"{name}_dropped"] gezählt,
+    Backpressure-Wartefälle in counters[f"{name}_blocked"]. Bei BLOCK kann
+    put_nowait() nicht warten: auf eine volle Queue wirft es QueueFull und
+    zählt counters[f"{name}_rejected"]. Mehrere Queues eines Calls können
+    sich ein counters-Dict teilen.
+    Die Wartezeit jedes abgeholten Elements landet in der Metrik
+    "{name}_queue_wait" (verworfene Elemente zählen nicht mit).
+    """
+
+    def __init__(self, maxsize, policy=DROP_OLDEST, name="queue", counters=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.name = name
+        self.counters = counters if counters is not None else {}
+        self.counters.setdefault(f"{name}_dropped", 0)
+        self.counters.setdefault(f"{name}_blocked", 0)
+        self.counters.setdefault(f"{name}_rejected", 0)
+        self._enqueued_at = deque()
+        self._wait_stage = f"{name}_queue_wait"
+        register_queue(self)
+
+    def _put(self, item):
+        self._enqueued_at.append(time.perf_counter())
+        super()._put(item)
+
+    def _get(self):
+        observe(self._wait_stage, time.perf_counter() - self._enqueued_at.popleft())
+        return super()._get()
+
+    async def put(self, item):
+        if self.policy == BLOCK:
+            if self.full():
+                self.counters[f"{self.name}_blocked"] += 1
+            await super().put(item)
+        else:
+            self.put_nowait(item)
+
+    def _drop_oldest(self):
+        # Ohne _get(): ein verworfenes Element soll keine Wartezeit melden
+        self._enqueued_at.popleft()
+        self._queue.popleft()
+        self.task_done()
+        self.counters[f"{self.name}_dropped"] += 1
+
+    def put_nowait(self, item):
+        if self.full():
+            if self.policy == BLOCK:
+                self.counters[f"{self.name}_rejected"] += 1
+                raise asyncio.QueueFull
+            if self.policy == SKIP and not _is_control(item):
+                self.counters[f"{self.name}_dropped"] += 1
+                return
+            self._drop_oldest()
+        super().put_nowait(item)
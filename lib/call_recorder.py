@@ -0,0 +1,312 @@
+"""
+Append-only Aufzeichnung des eingehenden μ-law-Audios pro Call.
+
+Der Eventloop legt Chunks nur in eine Queue (append() blockiert nie); ein
+Hintergrund-Thread schreibt sie mit großen Puffern in Segmentdateien:
+
+    <CALL_RECORDING_DIR>/<call_sid>/0000.ulaw, 0001.ulaw, ...   rohes μ-law, 8kHz
+    <CALL_RECORDING_DIR>/<call_sid>/index.idx                   struct "<QIII" pro Chunk:
+                                                               (Stream-Offset in Bytes, Segment, Dateiposition, Länge)
+
+Ein Alert-Fenster (z.B. start/end eines spoof_score) lässt sich per
+read_window() holen: Binärsuche im Index (mmap) und ein gezieltes read,
+ohne die Aufnahme komplett zu lesen.
+
+    python call_recorder.py recordings/ CA123 --start 12.4 --duration 2 -o window.ulaw
+
+Ist der Writer überlastet (volle Queue), werden Chunks verworfen und gezählt,
+statt den Call aufzuhalten. Der Stream-Offset läuft trotzdem weiter; read_window()
+füllt solche Lücken mit μ-law-Stille (0xFF), damit die Zeitachse stimmt.
+
+Jeder offene Call wird spätestens nach CALL_RECORDING_FLUSH_SECONDS bzw.
+CALL_RECORDING_FLUSH_BYTES geschrieben (erst Audio, dann Index), damit
+read_window() auch während eines Calls nur auf vorhandene Daten zeigt.
+Wird dieselbe call_sid nach close() neu geöffnet (z.B. Reconnect), geht die
+Aufnahme im letzten Segment und am Ende des Index weiter; ein zweites
+gleichzeitiges open_call() für eine laufende Aufnahme wird abgelehnt.
+"""
+import argparse
+import itertools
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+
+RECORDING_DIR = os.getenv("CALL_RECORDING_DIR")  # nicht gesetzt = keine Aufnahme
+SEGMENT_SECONDS = float(os.getenv("CALL_RECORDING_SEGMENT_SECONDS", "300"))
+WRITE_BUFFER = 1 << 20
+FLUSH_SECONDS = float(os.getenv("CALL_RECORDING_FLUSH_SECONDS", "1.0"))
+FLUSH_BYTES = int(os.getenv("CALL_RECORDING_FLUSH_BYTES", str(64 * 1024)))
+QUEUE_SIZE = 10000  # Chunks (à 0.4s) über alle Calls
+
+BYTES_PER_SECOND = 8000  # μ-law, 8kHz, mono
+INDEX_ENTRY = struct.Struct("<QIII")
+INDEX_NAME = "index.idx"
+MULAW_SILENCE = b"\xff"
+
+
+def _safe_name(call_id):
+    return re.sub(r"[^A-Za-z0-9_-]", "_", call_id) or "unknown"
+
+
+def _segment_path(call_dir, segment):
+    return os.path.join(call_dir, f"{segment:04d}.ulaw")
+
+
+def _last_entry(call_dir):
+    """Letzter vollständiger Index-Eintrag (offset, segment, pos, length) oder None."""
+    try:
+        with open(os.path.join(call_dir, INDEX_NAME), "rb") as f:
+            count = os.fstat(f.fileno()).st_size // INDEX_ENTRY.size
+            if count == 0:
+                return None
+            f.seek((count - 1) * INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+    except FileNotFoundError:
+        return None
+
+
+class CallRecording:
+    """Handle eines Calls; wird nur im Eventloop benutzt."""
+
+    def __init__(self, recorder, call_dir, stream_offset=0):
+        self._recorder = recorder
+        self.call_dir = call_dir
+        self.stream_offset = stream_offset  # Bytes seit Streamstart (bei Reopen: Ende der bisherigen Aufnahme)
+        self.last_seq = -1      # Sequenznummer des letzten angenommenen Chunks
+
+    def append(self, chunk):
+        self._recorder._submit(self, self.stream_offset, chunk)
+        self.stream_offset += len(chunk)
+
+    def close(self):
+        self._recorder._request_close(self)
+
+
+class _OpenFiles:
+    """Zustand eines Calls im Writer-Thread."""
+
+    def __init__(self, call_dir):
+        # Bestehende Aufnahme (Reopen): im letzten Segment weiterschreiben
+        last = _last_entry(call_dir)
+        self.segment = last[1] if last is not None else 0
+        self.segment_bytes = 0
+        self.data = None
+        self.index = open(os.path.join(call_dir, INDEX_NAME), "ab", buffering=WRITE_BUFFER)
+        self.unflushed = 0
+        self.flushed_at = time.monotonic()
+
+    def flush(self, now):
+        # Erst Audio, dann Index: ein Index-Eintrag zeigt nie auf ungeschriebene Bytes
+        if self.data is not None:
+            self.data.flush()
+        self.index.flush()
+        self.unflushed = 0
+        self.flushed_at = now
+
+
+class CallRecorder:
+    def __init__(self, directory, segment_seconds=SEGMENT_SECONDS, queue_size=QUEUE_SIZE):
+        self.directory = directory
+        self.segment_bytes = int(segment_seconds * BYTES_PER_SECOND)
+        self._queue = queue.Queue(queue_size)
+        # Close-Anfragen laufen getrennt und unbegrenzt, damit close() nie blockiert
+        self._closing = queue.SimpleQueue()
+        self._seq = itertools.count()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._open = set()  # call_dirs mit offenem CallRecording
+        self._ends = {}     # call_dir -> Stream-Offset bei close(), bis der Writer die Dateien geschlossen hat
+        self.chunks_written = 0
+        self.chunks_dropped = 0
+
+    def open_call(self, call_id):
+        """CallRecording für call_id, oder None, wenn die call_sid gerade schon aufgezeichnet wird."""
+        call_dir = os.path.join(self.directory, _safe_name(call_id))
+        with self._lock:
+            if call_dir in self._open:
+                print(f"Call recorder: {call_id} is already being recorded, not recording it twice")
+                return None
+            self._open.add(call_dir)
+            stream_offset = self._ends.get(call_dir)
+        if stream_offset is None:
+            # Keine ausstehenden Chunks mehr: der Index auf der Platte ist vollständig
+            os.makedirs(call_dir, exist_ok=True)
+            last = _last_entry(call_dir)
+            stream_offset = last[0] + last[3] if last is not None else 0
+        self._ensure_thread()
+        return CallRecording(self, call_dir, stream_offset)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="call-recorder", daemon=True)
+                    self._thread.start()
+
+    def _submit(self, recording, offset, chunk):
+        seq = next(self._seq)
+        try:
+            self._queue.put_nowait((seq, recording, offset, chunk))
+            recording.last_seq = seq
+        except queue.Full:
+            self.chunks_dropped += 1
+
+    def _request_close(self, recording):
+        with self._lock:
+            self._open.discard(recording.call_dir)
+            self._ends[recording.call_dir] = recording.stream_offset
+        self._closing.put((recording.last_seq, recording))
+
+    def _run(self):
+        files = {}  # call_dir -> _OpenFiles (ein Reopen schreibt in dieselben Dateien weiter)
+        closing = []
+        processed = -1  # Sequenznummer des zuletzt geschriebenen Chunks (Queue ist FIFO)
+        next_sweep = time.monotonic() + FLUSH_SECONDS
+        while True:
+            try:
+                seq, recording, offset, chunk = self._queue.get(timeout=FLUSH_SECONDS)
+            except queue.Empty:
+                pass
+            else:
+                processed = seq
+                state = files.get(recording.call_dir)
+                if state is None:
+                    state = files[recording.call_dir] = _OpenFiles(recording.call_dir)
+                try:
+                    self._write(recording.call_dir, state, offset, chunk)
+                    self.chunks_written += 1
+                    state.unflushed += len(chunk)
+                    if state.unflushed >= FLUSH_BYTES:
+                        state.flush(time.monotonic())
+                except OSError as e:
+                    print(f"Call recorder: write failed for {recording.call_dir}: {e}")
+
+            # Zeit-Schwelle: auch unter Last jeden offenen Call regelmäßig rausschreiben
+            now = time.monotonic()
+            if now >= next_sweep:
+                next_sweep = now + FLUSH_SECONDS
+                for call_dir, state in files.items():
+                    if state.unflushed and now - state.flushed_at >= FLUSH_SECONDS:
+                        try:
+                            state.flush(now)
+                        except OSError as e:
+                            print(f"Call recorder: flush failed for {call_dir}: {e}")
+
+            # Calls schließen, sobald ihr letzter Chunk geschrieben ist
+            while not self._closing.empty():
+                closing.append(self._closing.get_nowait())
+            if closing:
+                still_open = []
+                for last_seq, recording in closing:
+                    if last_seq <= processed:
+                        state = files.pop(recording.call_dir, None)
+                        if state is not None:
+                            self._close(state)
+                        with self._lock:
+                            # Ein späterer Reopen hat schon ein neueres Ende eingetragen
+                            if self._ends.get(recording.call_dir) == recording.stream_offset:
+                                del self._ends[recording.call_dir]
+                    else:
+                        still_open.append((last_seq, recording))
+                closing = still_open
+
+    def _write(self, call_dir, state, offset, chunk):
+        if state.data is None or state.segment_bytes >= self.segment_bytes:
+            if state.data is not None:
+                state.data.close()
+                state.segment += 1
+            path = _segment_path(call_dir, state.segment)
+            state.data = open(path, "ab", buffering=WRITE_BUFFER)
+            state.segment_bytes = os.path.getsize(path)
+        state.index.write(INDEX_ENTRY.pack(offset, state.segment, state.segment_bytes, len(chunk)))
+        state.data.write(chunk)
+        state.segment_bytes += len(chunk)
+
+    @staticmethod
+    def _close(state):
+        if state.data is not None:
+            state.data.close()
+        state.index.close()
+
+    def stats(self):
+        return {"written": self.chunks_written, "dropped": self.chunks_dropped, "queued": self._queue.qsize()}
+
+
+def _find_entry(index, count, offset):
+    """Letzter Index-Eintrag mit Stream-Offset <= offset (Binärsuche direkt im mmap)."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if INDEX_ENTRY.unpack_from(index, mid * INDEX_ENTRY.size)[0] <= offset:
+            lo = mid + 1
+        else:
+            hi = mid
+    return max(lo - 1, 0)
+
+
+def read_window(call_dir, start_seconds, duration_seconds=2.0):
+    """Liest μ-law-Bytes von start_seconds bis start_seconds + duration_seconds (Stream-Zeit)."""
+    index_path = os.path.join(call_dir, INDEX_NAME)
+    size = os.path.getsize(index_path)
+    count = size // INDEX_ENTRY.size
+    if count == 0:
+        return b""
+    position = int(start_seconds * BYTES_PER_SECOND)
+    end = position + int(duration_seconds * BYTES_PER_SECOND)
+    out = bytearray()
+    segments = {}
+    try:
+        with open(index_path, "rb") as f, \
+                mmap.mmap(f.fileno(), count * INDEX_ENTRY.size, access=mmap.ACCESS_READ) as index:
+            i = _find_entry(index, count, position)
+            while position < end and i < count:
+                offset, segment, pos, length = INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size)
+                i += 1
+                if offset + length <= position:
+                    continue
+                if offset > position:
+                    # Verworfene Chunks: Lücke mit Stille füllen, damit die Zeitachse stimmt
+                    gap = min(offset, end) - position
+                    out += MULAW_SILENCE * gap
+                    position += gap
+                    if position >= end:
+                        break
+                skip = position - offset
+                take = min(length - skip, end - position)
+                data = segments.get(segment)
+                if data is None:
+                    data = segments[segment] = open(_segment_path(call_dir, segment), "rb")
+                data.seek(pos + skip)
+                out += data.read(take)
+                position += take
+    finally:
+        for data in segments.values():
+            data.close()
+    return bytes(out)
+
+
+# Globale Instanz für die Server, nur wenn CALL_RECORDING_DIR gesetzt ist
+RECORDER = CallRecorder(RECORDING_DIR) if RECORDING_DIR else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="CALL_RECORDING_DIR")
+    parser.add_argument("call_sid")
+    parser.add_argument("--start", type=float, required=True, help="Stream-Sekunden")
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("-o", "--output", required=True, help=".ulaw-Ausgabe (rohes μ-law, 8kHz)")
+    args = parser.parse_args()
+
+    audio = read_window(os.path.join(args.directory, _safe_name(args.call_sid)), args.start, args.duration)
+    with open(args.output, "wb") as f:
+        f.write(audio)
+    print(f"Wrote {len(audio) / BYTES_PER_SECOND:.2f}s to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
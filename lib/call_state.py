@@ -0,0 +1,95 @@
+import datetime
+import os
+from collections import OrderedDict, deque
+
+# Wie viele Calls der Store höchstens kennt (die am längsten nicht aktualisierten fliegen raus)
+CALL_STATE_MAX_CALLS = int(os.getenv("CALL_STATE_MAX_CALLS", "500"))
+# Wie viele Alerts pro Call im Snapshot mitgeschickt werden
+CALL_STATE_ALERTS = int(os.getenv("CALL_STATE_ALERTS", "20"))
+
+_VERDICT_FIELDS = ("is_fraudulent", "fraud_type", "confidence", "reasoning", "content_score")
+
+
+class CallState:
+    def __init__(self, call_sid, max_alerts):
+        self.call_sid = call_sid
+        self.caller = None
+        self.start_time = datetime.datetime.now().isoformat()
+        self.ended = False
+        self.verdict = {}           # letzter fraud_update (is_fraudulent, confidence, reasoning, ...)
+        self.spoof_score = None     # letzter / höchster spoof_score
+        self.max_spoof_score = None
+        self.updated = self.start_time
+        self.alerts = deque(maxlen=max_alerts)
+
+    def to_dict(self):
+        return {
+            "call_sid": self.call_sid,
+            "caller": self.caller,
+            "start_time": self.start_time,
+            "ended": self.ended,
+            **self.verdict,
+            "spoof_score": self.spoof_score,
+            "max_spoof_score": self.max_spoof_score,
+            "updated": self.updated,
+            "alerts": list(self.alerts),
+        }
+
+
+class CallStateStore:
+    """
+    Zustand pro Call aus dem Alert-Strom, damit neue oder neu verbundene
+    /client-Dashboards sofort alles sehen statt auf die nächsten Alerts zu warten.
+
+    apply() ist O(1) pro Alert: Dict-Lookup, move_to_end, deque-Append.
+    Begrenzt auf max_calls Calls (LRU) und max_alerts Alerts pro Call.
+    spoof_score-Events kommen alle paar Sekunden und landen deshalb nur als
+    letzter/höchster Score im Zustand, nicht in der Alert-Liste.
+    """
+
+    def __init__(self, max_calls=CALL_STATE_MAX_CALLS, max_alerts=CALL_STATE_ALERTS):
+        self.max_calls = max_calls
+        self.max_alerts = max_alerts
+        self._calls = OrderedDict()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def apply(self, alert):
+        call_sid = alert.get("call_sid")
+        if call_sid is None:
+            return
+        state = self._calls.get(call_sid)
+        if state is None:
+            state = self._calls[call_sid] = CallState(call_sid, self.max_alerts)
+            if len(self._calls) > self.max_calls:
+                self._calls.popitem(last=False)
+        else:
+            self._calls.move_to_end(call_sid)
+
+        event = alert.get("event")
+        state.updated = alert.get("timestamp") or datetime.datetime.now().isoformat()
+        if event == "spoof_score":
+            state.spoof_score = alert["score"]
+            if state.max_spoof_score is None or alert["score"] > state.max_spoof_score:
+                state.max_spoof_score = alert["score"]
+            return
+        if event == "call_started":
+            state.caller = alert.get("caller") or state.caller
+            state.start_time = alert.get("start_time") or state.start_time
+        elif event == "call_ended":
+            state.ended = True
+        elif event == "fraud_update":
+            for field in _VERDICT_FIELDS:
+                if field in alert:
+                    state.verdict[field] = alert[field]
+        state.alerts.append(alert)
+
+    def snapshot(self, call_sid=None):
+        """{"event": "snapshot", "calls": [...]} für alle Calls (zuletzt aktualisierte am Ende) oder nur call_sid."""
+        if call_sid is None:
+            calls = [state.to_dict() for state in self._calls.values()]
+        else:
+            state = self._calls.get(call_sid)
+            calls = [state.to_dict()] if state is not None else []
+        return {"event": "snapshot", "calls": calls}
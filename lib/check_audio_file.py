@@ -1,8 +1,25 @@
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
+"""
+Offline-/Debug-Werkzeug: prüft Audioqualität und zeigt das Spektrogramm.
+
+Nicht für den Serving-Pfad gedacht (librosa + blockierendes plt.show());
+dort liefert audio_stats.audio_stats die Kennzahlen.
+
+    python check_audio_file.py aufnahme.wav
+"""
+import asyncio
+import sys
+
 import numpy as np
 
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
 def check_audio_file(audio_input, sr=16000, plot=True):
     """
     Prüft Audioqualität und zeigt Spektrogramm.
@@ -13,6 +30,11 @@ def check_audio_file(audio_input, sr=16000, plot=True):
 
     sr: Samplingrate, falls audio_input ein Array ist.
     """
+    if plot and _in_event_loop():
+        raise RuntimeError("check_audio_file(plot=True) blocks; it must not run inside the asyncio serving loop")
+
+    import librosa
+
     if isinstance(audio_input, str):
         audio, sr = librosa.load(audio_input, sr=None)
         filename = audio_input
@@ -27,9 +49,12 @@ def check_audio_file(audio_input, sr=16000, plot=True):
     print(f"Audioquelle: {filename}")
     print(f"Samplingrate: {sr} Hz")
     print(f"Dauer: {len(audio)/sr:.2f} Sekunden")
-    print(f"Maximaler Wert: {max(audio):.3f}, Minimaler Wert: {min(audio):.3f}")
+    print(f"Maximaler Wert: {np.max(audio):.3f}, Minimaler Wert: {np.min(audio):.3f}")
 
     if plot:
+        import librosa.display
+        import matplotlib.pyplot as plt
+
         S = librosa.feature.melspectrogram(y=audio, sr=sr, n_mels=40)
         log_S = librosa.power_to_db(S, ref=np.max)
         plt.figure(figsize=(10, 4))
@@ -38,3 +63,8 @@ def check_audio_file(audio_input, sr=16000, plot=True):
         plt.title('Log-Mel-Spectrogram')
         plt.tight_layout()
         plt.show()
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        check_audio_file(path)
@@ -0,0 +1,47 @@
+class AudioChunker:
+    """
+    Zerlegt eingehende Twilio-Payloads in Chunks fester Größe
+    (Default 20 * 160 = 3200 Bytes = 0.4 s μ-law bei 8kHz).
+
+    Ersetzt das Muster `inbuffer.extend(...); inbuffer = inbuffer[BUFFER_SIZE:]`,
+    das bei jedem Flush den kompletten Rest kopiert. Hier gibt es einen festen
+    Puffer mit Füllstand: jedes Byte wird einmal in den Puffer und einmal in
+    den ausgegebenen Chunk kopiert; ganze Chunks im Payload sogar nur einmal.
+    """
+
+    def __init__(self, chunk_size=20 * 160):
+        self.chunk_size = chunk_size
+        self._buf = bytearray(chunk_size)
+        self._view = memoryview(self._buf)
+        self._fill = 0
+
+    def __len__(self):
+        """Bytes, die noch auf einen vollen Chunk warten."""
+        return self._fill
+
+    def feed(self, data):
+        """Nimmt einen Payload (bytes-artig) und gibt die fertigen Chunks (bytes) zurück."""
+        n = len(data)
+        if self._fill + n < self.chunk_size:
+            # Häufigster Fall (160-Byte-Frame): nur anhängen, kein memoryview, keine Liste
+            self._buf[self._fill:self._fill + n] = data
+            self._fill += n
+            return ()
+
+        chunks = []
+        data = memoryview(data)
+        size = self.chunk_size
+        pos = 0
+        while pos < n:
+            if self._fill == 0 and n - pos >= size:
+                chunks.append(bytes(data[pos:pos + size]))
+                pos += size
+                continue
+            take = min(size - self._fill, n - pos)
+            self._view[self._fill:self._fill + take] = data[pos:pos + take]
+            self._fill += take
+            pos += take
+            if self._fill == size:
+                chunks.append(bytes(self._buf))
+                self._fill = 0
+        return chunks
@@ -0,0 +1,126 @@
+"""
+Vergleicht das int8-quantisierte AASIST-Modell mit fp32 auf einem Ordner mit Aufnahmen.
+
+Berichtet pro Fenster die Score-Abweichung, die Speedup-Rate und, wenn Labels
+bekannt sind, die EER beider Modelle. Labels kommen aus einer CSV-Datei
+(datei,label mit label = bonafide|spoof) oder aus dem Ordnernamen
+(.../bonafide/x.wav, .../spoof/y.wav).
+
+    python compare_quantized.py samples/ --labels labels.csv --threads 1
+"""
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+import torch
+
+from anti_spoofing import windows_from_audio, score_windows
+from audio_files import find_audio_files, read_audio_file
+from model_loader import get_model
+
+LABELS = ("bonafide", "spoof")
+
+
+def read_labels(path):
+    labels = {}
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[1].strip() in LABELS:
+                labels[os.path.basename(row[0].strip())] = row[1].strip()
+    return labels
+
+
+def label_for(path, labels):
+    if labels is not None:
+        return labels.get(os.path.basename(path))
+    parent = os.path.basename(os.path.dirname(path))
+    return parent if parent in LABELS else None
+
+
+def compute_eer(bonafide_scores, spoof_scores):
+    """
+    EER mit der Konvention aus extract_scores: hoher Score = Spoof (Klasse 0 bei
+    AASIST), wie im Server (score > 0.8 -> Spoof). Bei Schwelle t gilt score >= t
+    als Spoof: FRR = echte Fenster mit score >= t, FAR = Spoof-Fenster mit score < t.
+    """
+    bonafide_scores = np.sort(np.asarray(bonafide_scores))
+    spoof_scores = np.sort(np.asarray(spoof_scores))
+    thresholds = np.concatenate([bonafide_scores, spoof_scores])
+    frr = 1.0 - np.searchsorted(bonafide_scores, thresholds, side="left") / len(bonafide_scores)
+    far = np.searchsorted(spoof_scores, thresholds, side="left") / len(spoof_scores)
+    i = np.argmin(np.abs(frr - far))
+    return (frr[i] + far[i]) / 2
+
+
+def timed_scores(model, windows, batch_size):
+    scores = []
+    start = time.perf_counter()
+    for i in range(0, windows.shape[0], batch_size):
+        scores.extend(score_windows(model, windows[i:i + batch_size]))
+    return np.asarray(scores), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Audiodateien oder Ordner (.wav, .ulaw, ...)")
+    parser.add_argument("--labels", help="CSV mit datei,label (bonafide|spoof)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=1, help="torch-Threads, 1 = Kosten pro Core")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    labels = read_labels(args.labels) if args.labels else None
+    fp32_model = get_model(quantized=False).to("cpu")
+    int8_model = get_model(quantized=True)
+
+    fp32_time = int8_time = 0.0
+    deltas = []
+    file_scores = {"fp32": {"bonafide": [], "spoof": []}, "int8": {"bonafide": [], "spoof": []}}
+    files = find_audio_files(args.paths)
+    for path in files:
+        samples, sample_rate = read_audio_file(path)
+        windows, _ = windows_from_audio(samples, sample_rate)
+        if windows.shape[0] == 0:
+            print(f"skip {path}: shorter than one window")
+            continue
+
+        fp32_scores, elapsed = timed_scores(fp32_model, windows, args.batch_size)
+        fp32_time += elapsed
+        int8_scores, elapsed = timed_scores(int8_model, windows, args.batch_size)
+        int8_time += elapsed
+        deltas.append(np.abs(fp32_scores - int8_scores))
+
+        label = label_for(path, labels)
+        if label is not None:
+            file_scores["fp32"][label].append(fp32_scores.mean())
+            file_scores["int8"][label].append(int8_scores.mean())
+
+    if not deltas:
+        print("No scorable files found.")
+        return
+
+    deltas = np.concatenate(deltas)
+    print()
+    print(f"Files:             {len(files)}")
+    print(f"Windows:           {len(deltas)}")
+    print(f"Score delta mean:  {deltas.mean():.4f}")
+    print(f"Score delta p99:   {np.percentile(deltas, 99):.4f}")
+    print(f"Score delta max:   {deltas.max():.4f}")
+    print(f"fp32 time:         {fp32_time:.2f}s ({fp32_time / len(deltas) * 1000:.1f} ms/window)")
+    print(f"int8 time:         {int8_time:.2f}s ({int8_time / len(deltas) * 1000:.1f} ms/window)")
+    print(f"Speedup:           {fp32_time / int8_time:.2f}x")
+
+    if all(file_scores["fp32"][label] for label in LABELS):
+        fp32_eer = compute_eer(file_scores["fp32"]["bonafide"], file_scores["fp32"]["spoof"])
+        int8_eer = compute_eer(file_scores["int8"]["bonafide"], file_scores["int8"]["spoof"])
+        print(f"EER fp32:          {fp32_eer * 100:.2f}%")
+        print(f"EER int8:          {int8_eer * 100:.2f}%")
+        print(f"EER change:        {(int8_eer - fp32_eer) * 100:+.2f} pp")
+    else:
+        print("EER:               n/a (need labelled bonafide and spoof files)")
+
+
+if __name__ == "__main__":
+    main()
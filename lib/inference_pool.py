@@ -0,0 +1,55 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+
+def _init_worker(num_threads):
+    # Jeder Worker-Thread bekommt nur seinen Anteil an Intra-Op-Threads,
+    # sonst überbuchen sich mehrere parallele Forward-Passes gegenseitig.
+    torch.set_num_threads(num_threads)
+
+
+class InferencePool:
+    """
+    Führt Resampling und AASIST-Inferenz in einem eigenen Thread-Pool aus,
+    damit der asyncio-Eventloop (Twilio-Frames, Alerts) nicht blockiert.
+
+    pool_size:          Anzahl paralleler Worker-Threads
+    threads_per_worker: torch.set_num_threads pro Worker (Default: CPUs / pool_size)
+    """
+
+    def __init__(self, pool_size=2, threads_per_worker=None):
+        self.pool_size = pool_size
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // pool_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size,
+            thread_name_prefix="aasist",
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,),
+        )
+        self.pending = 0
+
+    @property
+    def queue_depth(self):
+        """Jobs, die abgegeben, aber noch nicht fertig sind (laufend + wartend)."""
+        return self.pending
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "threads_per_worker": self.threads_per_worker,
+            "queue_depth": self.pending,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
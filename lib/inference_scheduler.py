@@ -0,0 +1,126 @@
+import asyncio
+import collections
+
+import torch
+
+from anti_spoofing import score_windows
+
+
+class InferenceScheduler:
+    """
+    Sammelt 2-Sekunden-Fenster aller aktiven Calls und rechnet sie als einen
+    Batch [B, 32000] durch das AASIST-Modell.
+
+    max_batch_size: maximale Anzahl Fenster pro Forward-Pass
+    max_wait_ms:    wie lange nach dem ersten Fenster auf weitere gewartet wird
+    pool:           optionaler InferencePool; dann laufen bis zu pool_size Batches
+                    parallel außerhalb des Eventloops
+    """
+
+    def __init__(self, model, max_batch_size=16, max_wait_ms=20, pool=None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pool = pool
+        self._pending = collections.deque()
+        self._arrived = asyncio.Event()
+        # Solange alle Worker rechnen, sammeln sich neue Fenster zu größeren Batches
+        self._workers = asyncio.Semaphore(pool.pool_size if pool is not None else 1)
+        self._inflight = set()
+        self._task = None
+        self.batches = 0
+        self.windows = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def queue_depth(self):
+        """Fenster, die noch auf einen Batch warten."""
+        return len(self._pending)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "inflight_batches": len(self._inflight),
+            "batches": self.batches,
+            "windows": self.windows,
+            "avg_batch_size": self.windows / self.batches if self.batches else 0.0,
+        }
+
+    async def score(self, audio_window):
+        """Reiht ein Fenster [32000] ein und wartet auf seinen Score."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((audio_window, future))
+        self._arrived.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._arrived.clear()
+                await self._arrived.wait()
+                continue
+
+            await self._workers.acquire()
+            batch = [self._pending.popleft()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if self._pending:
+                    batch.append(self._pending.popleft())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch):
+        try:
+            await self._forward(batch)
+        finally:
+            self._workers.release()
+
+    async def _forward(self, batch):
+        # Calls, die inzwischen beendet wurden, nicht mehr rechnen
+        batch = [(window, future) for window, future in batch if not future.done()]
+        if not batch:
+            return
+
+        windows = torch.stack([window for window, _ in batch])  # Shape: [B, 32000]
+        try:
+            if self.pool is not None:
+                scores = await self.pool.run(score_windows, self.model, windows)
+            else:
+                scores = score_windows(self.model, windows)
+        except Exception as e:
+            print(f"Batched inference failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.windows += len(batch)
+        for (_, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
@@ -0,0 +1,235 @@
+"""
+Lokales Content-Scoring: Betrugsphrasen in Transkripten per Aho-Corasick.
+
+Die Phrasenliste wird einmal in einen Automaten kompiliert (Zeit pro
+Transkript linear in der Textlänge, unabhängig von der Anzahl Phrasen).
+KeywordStream matcht pro Call inkrementell:
+  - Partials, die das vorige Partial nur verlängern, werden ab dem
+    gespeicherten Automatenzustand weitergefüttert (nur das Delta).
+  - Korrigiert Deepgram ein Partial, wird die Äußerung ab dem Zustand nach
+    dem letzten Final neu gefüttert; schon gemeldete Treffer kommen nicht doppelt.
+  - total_weight = Gewichte aller Finals + Gewichte des aktuellen Partials;
+    fällt ein Treffer durch eine Korrektur weg, zählt sein Gewicht nicht mehr.
+  - Nach einem Final geht der Zustand in die nächste Äußerung über, Phrasen
+    über Äußerungsgrenzen hinweg werden also auch gefunden.
+
+Phrasen matchen ab Wortanfang ("transfer" trifft auch "transferring"), damit
+ein Treffer schon im Partial auffällt, sobald das Wort vollständig ist.
+
+FRAUD_PHRASES_FILE: eine Phrase pro Zeile, optional mit Gewicht
+("gift card<TAB>2.0" oder "gift card,2.0"); # leitet Kommentare ein.
+KEYWORD_ALERT_WEIGHT: Summe der Gewichte eines Calls, ab der ein Alert
+ausgelöst wird.
+"""
+import os
+import re
+from collections import deque
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+KEYWORD_ALERT_WEIGHT = float(os.getenv("KEYWORD_ALERT_WEIGHT", "3.0"))
+
+# Die keyterms aus den Deepgram-Settings plus typische Betrugsformulierungen
+DEFAULT_PHRASES = {
+    "urgent": 1.0,
+    "password": 2.0,
+    "verify": 1.0,
+    "social security": 2.0,
+    "transfer": 1.0,
+    "verification code": 3.0,
+    "one time code": 3.0,
+    "pin number": 2.0,
+    "gift card": 3.0,
+    "wire the money": 3.0,
+    "bitcoin": 2.0,
+    "crypto wallet": 2.0,
+    "account has been suspended": 2.0,
+    "account has been compromised": 2.0,
+    "unusual activity": 1.0,
+    "do not hang up": 2.0,
+    "don't tell anyone": 3.0,
+    "keep this confidential": 2.0,
+    "arrest warrant": 3.0,
+    "irs": 1.0,
+    "tax refund": 1.0,
+    "remote access": 3.0,
+    "anydesk": 3.0,
+    "teamviewer": 3.0,
+    "safe account": 3.0,
+    "bank details": 2.0,
+    "card number": 2.0,
+    "security code": 2.0,
+    "act now": 1.0,
+    "final notice": 1.0,
+}
+
+
+def normalize(text):
+    """Kleinbuchstaben, nur Wörter, durch genau ein Leerzeichen getrennt."""
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def load_phrases(path):
+    phrases = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            phrase, weight = line, 1.0
+            for sep in ("\t", ","):
+                if sep in line:
+                    phrase, _, value = line.rpartition(sep)
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        phrase, weight = line, 1.0
+                    break
+            if normalize(phrase):
+                phrases[phrase.strip()] = weight
+    return phrases
+
+
+class KeywordAutomaton:
+    """Aho-Corasick über Zeichen; jede Phrase beginnt mit einer Wortgrenze (" ")."""
+
+    def __init__(self, phrases):
+        self.phrases = []
+        self.weights = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for phrase, weight in phrases.items():
+            key = normalize(phrase)
+            if key:
+                self._insert(" " + key, len(self.phrases))
+                self.phrases.append(phrase)
+                self.weights.append(weight)
+        self._build()
+
+    def _insert(self, key, phrase_id):
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + (phrase_id,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def feed(self, state, text, hits):
+        """Füttert text ab state, hängt Phrasen-IDs an hits an, gibt den neuen Zustand zurück."""
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hits.extend(out[state])
+        return state
+
+
+class KeywordStream:
+    """Inkrementeller Matcher für die Transkripte eines Calls."""
+
+    def __init__(self, automaton):
+        self.automaton = automaton
+        self.committed_weight = 0.0  # Gewichte aus Finals, ändert sich nicht mehr
+        self.utterance_weight = 0.0  # Gewichte der aktuellen Äußerung (laut letztem Partial)
+        self._committed = 0     # Zustand nach dem letzten Final
+        self._state = 0
+        self._fed = ""          # bereits gefütterter Text der aktuellen Äußerung
+        self._counts = {}       # Treffer pro Phrase in der aktuellen Äußerung
+        self._reported = {}     # davon schon gemeldet
+
+    @property
+    def total_weight(self):
+        return self.committed_weight + self.utterance_weight
+
+    def feed(self, transcript, is_final=False):
+        """Gibt neu gefundene Phrasen als [(phrase, gewicht), ...] zurück."""
+        text = " " + normalize(transcript)
+        hits = []
+        if text.startswith(self._fed):
+            self._state = self.automaton.feed(self._state, text[len(self._fed):], hits)
+        else:
+            # Partial wurde korrigiert: Äußerung neu zählen
+            self._counts = {}
+            self.utterance_weight = 0.0
+            self._state = self.automaton.feed(self._committed, text, hits)
+        self._fed = text
+
+        new = []
+        for phrase_id in hits:
+            count = self._counts.get(phrase_id, 0) + 1
+            self._counts[phrase_id] = count
+            weight = self.automaton.weights[phrase_id]
+            self.utterance_weight += weight
+            if count > self._reported.get(phrase_id, 0):
+                self._reported[phrase_id] = count
+                new.append((self.automaton.phrases[phrase_id], weight))
+
+        if is_final:
+            self.committed_weight += self.utterance_weight
+            self.utterance_weight = 0.0
+            self._committed = self._state
+            self._fed = ""
+            self._counts = {}
+            self._reported = {}
+        return new
+
+
+_automaton = None
+
+
+def get_automaton():
+    """Automat aus FRAUD_PHRASES_FILE (oder DEFAULT_PHRASES), einmal pro Prozess gebaut."""
+    global _automaton
+    if _automaton is None:
+        path = os.getenv("FRAUD_PHRASES_FILE")
+        phrases = load_phrases(path) if path else DEFAULT_PHRASES
+        _automaton = KeywordAutomaton(phrases)
+        print(f"Keyword matcher ready: {len(_automaton.phrases)} phrases")
+    return _automaton
+
+
+def new_stream():
+    return KeywordStream(get_automaton())
+
+
+def keyword_alert(stream, hits, call_sid=None):
+    """
+    fraud_update-Alert für neue Treffer, sobald der Call KEYWORD_ALERT_WEIGHT erreicht
+    (gleiches Format wie die LLM-Analyse, damit alle Frontends ihn anzeigen), sonst None.
+    """
+    if not hits or stream.total_weight < KEYWORD_ALERT_WEIGHT:
+        return None
+    confidence = "high" if stream.total_weight >= 2 * KEYWORD_ALERT_WEIGHT else "medium"
+    phrases = [phrase for phrase, _ in hits]
+    return {
+        "event": "fraud_update",
+        "source": "keywords",
+        "call_sid": call_sid,
+        "is_fraudulent": True,
+        "fraud_type": "content",
+        "confidence": confidence,
+        "reasoning": "Suspicious phrases: " + ", ".join(phrases),
+        "phrases": phrases,
+        "content_score": stream.total_weight,
+    }
@@ -0,0 +1,271 @@
+"""
+Lastgenerator: N gleichzeitige Twilio-Media-Streams gegen /twilio.
+
+Spielt μ-law-Aufnahmen (oder synthetisches Audio) in Echtzeit als
+connected/start/media/stop-Frames ab (20ms-Frames à 160 Bytes) und hört
+parallel auf /client mit, um die Alerts/Scores der Calls zu messen:
+
+  - ingest lag:          wie spät ein Frame gegenüber dem Echtzeit-Takt
+                         gesendet wurde (Backpressure des Servers)
+  - time to first score: Callstart bis zum ersten Event des Calls auf /client
+  - alert latency:       Empfang minus Zeitpunkt, an dem das bewertete Audio
+                         gesendet wurde (spoof_score: Fensterende "end";
+                         fraud_update: n * --analysis-seconds des Mocks)
+  - CPU pro Call:        CPU-Zeit der Server-Prozesse (/proc/<pid>/stat)
+                         pro Call und pro Sekunde Audio
+
+Beispiel (lib/server.py mit Modell):
+    python server.py &
+    python loadtest.py --calls 20 --server-pid $! recordings/
+
+Beispiel (main.py gegen den Mock):
+    python mock_deepgram.py &
+    DEEPGRAM_AGENT_URL=ws://localhost:8765/v1/agent/converse DEEPGRAM_API_KEY=x python main.py &
+    python loadtest.py --calls 50 --seconds 30 --analysis-seconds 2 --server-pid $!
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+
+import numpy as np
+import websockets
+
+from alert_broadcaster import decode_alert_frame
+from audio_files import MULAW_EXTENSIONS, find_audio_files, read_audio_file
+from mulaw import encode_mulaw
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160  # 20ms
+FRAME_SECONDS = FRAME_BYTES / SAMPLE_RATE
+
+_MEDIA_FRAME = ('{"event":"media","sequenceNumber":"%d","media":{"track":"inbound","chunk":"%d",'
+                '"timestamp":"%d","payload":"%s"},"streamSid":"%s"}')
+
+
+def load_mulaw(path):
+    """Liest eine Aufnahme als μ-law-Bytes (8kHz); andere Formate werden umgerechnet."""
+    if path.lower().endswith(MULAW_EXTENSIONS):
+        with open(path, "rb") as f:
+            return f.read()
+    samples, sample_rate = read_audio_file(path)
+    if sample_rate != SAMPLE_RATE:
+        # Für den Lasttest reicht lineare Interpolation
+        n = int(len(samples) * SAMPLE_RATE / sample_rate)
+        samples = np.interp(np.arange(n) * sample_rate / SAMPLE_RATE, np.arange(len(samples)), samples)
+    return encode_mulaw(samples)
+
+
+def synthetic_audio(seconds, seed=0):
+    """Sprachähnliches Testsignal: modulierter Ton + Rauschen, mit Pausen."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = (np.sin(2 * np.pi * 0.5 * t) > -0.3).astype(np.float32)
+    signal = 0.3 * np.sin(2 * np.pi * (180 + 40 * np.sin(2 * np.pi * 3 * t)) * t)
+    signal += 0.05 * rng.standard_normal(len(t))
+    return encode_mulaw(signal * envelope)
+
+
+def encode_payloads(audio):
+    """Base64-Payloads einmal vorberechnen, damit der Generator selbst kaum CPU braucht."""
+    usable = len(audio) - len(audio) % FRAME_BYTES
+    return [base64.b64encode(audio[i:i + FRAME_BYTES]).decode("ascii") for i in range(0, usable, FRAME_BYTES)]
+
+
+def read_cpu_seconds(pid):
+    """utime + stime eines Prozesses in Sekunden (Linux /proc)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # Nach dem Prozessnamen: state ist Feld 3, utime/stime sind Feld 14/15
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def percentiles(values, ps=(50, 95, 99)):
+    if not values:
+        return {f"p{p}": None for p in ps} | {"max": None}
+    ordered = sorted(values)
+    result = {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in ps}
+    result["max"] = ordered[-1]
+    return result
+
+
+class CallStats:
+    def __init__(self, index, frames):
+        self.call_sid = f"CAloadtest{index:05d}"
+        self.stream_sid = f"MZloadtest{index:05d}"
+        self.frames = frames
+        self.t0 = None
+        self.lags = []
+        self.first_event = None
+        self.events = 0
+        self.alert_latencies = []
+        self.downstream_messages = 0
+        self.error = None
+
+
+async def run_call(url, stats, start_delay, linger):
+    await asyncio.sleep(start_delay)
+    loop = asyncio.get_running_loop()
+    try:
+        async with websockets.connect(url) as ws:
+            async def drain():
+                # TTS-Audio / clear-Nachrichten vom Server abnehmen
+                async for _ in ws:
+                    stats.downstream_messages += 1
+
+            drain_task = asyncio.create_task(drain())
+            await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+            await ws.send(json.dumps({
+                "event": "start",
+                "sequenceNumber": "1",
+                "start": {
+                    "streamSid": stats.stream_sid,
+                    "callSid": stats.call_sid,
+                    "tracks": ["inbound"],
+                    "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": SAMPLE_RATE, "channels": 1},
+                },
+                "streamSid": stats.stream_sid,
+            }))
+            stats.t0 = loop.time()
+            for k, payload in enumerate(stats.frames):
+                target = stats.t0 + k * FRAME_SECONDS
+                delay = target - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await ws.send(_MEDIA_FRAME % (k + 2, k + 1, k * 20, payload, stats.stream_sid))
+                stats.lags.append(max(0.0, loop.time() - target))
+            await ws.send(json.dumps({"event": "stop", "streamSid": stats.stream_sid}))
+            await asyncio.sleep(linger)  # letzte Scores abwarten
+            drain_task.cancel()
+    except Exception as e:
+        stats.error = f"{type(e).__name__}: {e}"
+
+
+async def watch_alerts(url, calls, analysis_seconds):
+    loop = asyncio.get_running_loop()
+    async with websockets.connect(url) as ws:
+        async for message in ws:
+            now = loop.time()
+            for alert in decode_alert_frame(message):
+                # Nur Bewertungen zählen, nicht call_started/call_ended/snapshot
+                if alert.get("event") not in ("spoof_score", "fraud_update"):
+                    continue
+                stats = calls.get(alert.get("call_sid"))
+                if stats is None or stats.t0 is None:
+                    continue
+                stats.events += 1
+                if stats.first_event is None:
+                    stats.first_event = now - stats.t0
+                if "end" in alert:
+                    audio_time = alert["end"]
+                elif analysis_seconds:
+                    audio_time = stats.events * analysis_seconds
+                else:
+                    continue
+                stats.alert_latencies.append(now - (stats.t0 + audio_time))
+
+
+def fmt_ms(value):
+    return "-" if value is None else f"{value * 1000:.0f}ms"
+
+
+def print_distribution(name, values):
+    p = percentiles(values)
+    print(f"{name:<22} p50 {fmt_ms(p['p50']):>8}  p95 {fmt_ms(p['p95']):>8}  "
+          f"p99 {fmt_ms(p['p99']):>8}  max {fmt_ms(p['max']):>8}  (n={len(values)})")
+
+
+async def run(args):
+    files = find_audio_files(args.paths)
+    if files:
+        audios = [load_mulaw(path)[:int(args.seconds * SAMPLE_RATE)] if args.seconds else load_mulaw(path)
+                  for path in files]
+    else:
+        audios = [synthetic_audio(args.seconds or 20.0, seed) for seed in range(4)]
+    payloads = [encode_payloads(audio) for audio in audios]
+
+    calls = [CallStats(i, payloads[i % len(payloads)]) for i in range(args.calls)]
+    by_sid = {stats.call_sid: stats for stats in calls}
+    client_url = args.client_url or args.url.rsplit("/", 1)[0] + "/client"
+
+    watcher = asyncio.create_task(watch_alerts(client_url, by_sid, args.analysis_seconds))
+    await asyncio.sleep(0.2)  # Subscriber vor dem ersten Call verbinden
+
+    cpu_before = {pid: read_cpu_seconds(pid) for pid in args.server_pid}
+    own_cpu = time.process_time()
+    wall = time.monotonic()
+    ramp = args.ramp / max(1, args.calls - 1) if args.calls > 1 else 0.0
+    await asyncio.gather(*(run_call(args.url, stats, i * ramp, args.linger) for i, stats in enumerate(calls)))
+    wall = time.monotonic() - wall
+    own_cpu = time.process_time() - own_cpu
+    server_cpu = sum(read_cpu_seconds(pid) - before for pid, before in cpu_before.items())
+    watcher.cancel()
+
+    audio_seconds = sum(len(stats.frames) * FRAME_SECONDS for stats in calls if stats.error is None)
+    failed = [stats for stats in calls if stats.error is not None]
+
+    if args.per_call:
+        for stats in calls:
+            p = percentiles(stats.lags)
+            print(f"{stats.call_sid}: lag p95 {fmt_ms(p['p95'])}, first event {fmt_ms(stats.first_event)}, "
+                  f"events {stats.events}{', ERROR ' + stats.error if stats.error else ''}")
+
+    print(f"\n{args.calls} calls ({len(failed)} failed), {audio_seconds:.0f}s audio in {wall:.1f}s wall")
+    print_distribution("ingest lag", [lag for stats in calls for lag in stats.lags])
+    print_distribution("time to first score", [s.first_event for s in calls if s.first_event is not None])
+    print_distribution("alert latency", [lat for stats in calls for lat in stats.alert_latencies])
+    print(f"calls without events:  {sum(1 for s in calls if s.events == 0)}")
+    summary = {
+        "calls": args.calls,
+        "failed": len(failed),
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "generator_cpu_seconds": own_cpu,
+    }
+    if args.server_pid and audio_seconds > 0:
+        per_audio_second = server_cpu / audio_seconds
+        summary.update(server_cpu_seconds=server_cpu, server_cpu_per_call=server_cpu / args.calls,
+                       server_cpu_per_audio_second=per_audio_second)
+        print(f"server CPU:            {server_cpu:.1f}s total, {server_cpu / args.calls:.2f}s per call, "
+              f"{per_audio_second * 100:.1f}% of a core per live call")
+        if per_audio_second > 0:
+            print(f"estimated ceiling:     ~{os.cpu_count() / per_audio_second:.0f} concurrent calls "
+                  f"on {os.cpu_count()} cores (CPU-bound)")
+    print(f"generator CPU:         {own_cpu:.1f}s")
+    for stats in failed[:5]:
+        print(f"  {stats.call_sid}: {stats.error}")
+
+    if args.json:
+        summary.update(
+            ingest_lag=percentiles([lag for stats in calls for lag in stats.lags]),
+            time_to_first_score=percentiles([s.first_event for s in calls if s.first_event is not None]),
+            alert_latency=percentiles([lat for stats in calls for lat in stats.alert_latencies]),
+        )
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="Audiodateien oder Ordner; ohne Angabe synthetisches Audio")
+    parser.add_argument("--url", default="ws://localhost:5000/twilio")
+    parser.add_argument("--client-url", help="Default: <url ohne letzten Pfadteil>/client "
+                        "(z.B. .../client?batch_ms=50&encoding=msgpack für gebündelte Frames)")
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=None, help="Audio pro Call begrenzen (synthetisch: Länge)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Calls über so viele Sekunden verteilt starten")
+    parser.add_argument("--linger", type=float, default=3.0, help="nach stop auf letzte Scores warten")
+    parser.add_argument("--analysis-seconds", type=float, default=0.0,
+                        help="Intervall des Mock-Agents für fraud_update-Latenzen (0 = nicht messen)")
+    parser.add_argument("--server-pid", type=int, action="append", default=[],
+                        help="PID(s) der Server-Prozesse für die CPU-Messung (mehrfach für Worker)")
+    parser.add_argument("--per-call", action="store_true")
+    parser.add_argument("--json", help="Zusammenfassung zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Leichtgewichtige Latenz-Histogramme und Gauges im Prometheus-Textformat.
+
+Stufen der Pipeline (Label "stage" von fraud_stage_seconds):
+    frame_parse     Twilio-Frame dekodieren (pro Frame)
+    <name>_queue_wait  Wartezeit in einer BoundedQueue (z.B. audio_queue_wait)
+    resample        μ-law -> 16kHz (pro 0.4s-Chunk)
+    inference       Score eines Fensters aus Sicht des Calls (inkl. Batching-Wartezeit)
+    model_forward   reiner Forward-Pass pro Batch
+    keyword_match   Transkript durch den Aho-Corasick-Matcher
+    alert_publish   Alert an alle Subscriber verteilen
+    alert_send      Alert an einen /client senden
+
+Observe kostet ein bisect + Lock, Timer nutzen perf_counter; es wird nichts
+pro Messung gespeichert, nur Bucket-Zähler.
+
+    with timed("resample"):
+        ...
+    print(render())  # bzw. /metrics
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Sekunden; deckt Frame-Parsing (µs) bis Inferenz unter Last (s) ab
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # letzter Eintrag = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()  # Resampling/Inferenz laufen auch in Pool-Threads
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = {}  # name -> (help, label, {label_value: Histogram})
+        self._gauges = {}      # name -> (help, label, fn() -> {label_value: value} | value)
+        self._lock = threading.Lock()
+
+    def histogram(self, name, label_value, help_text="", label="stage"):
+        family = self._histograms.get(name)
+        if family is None or label_value not in family[2]:
+            with self._lock:
+                family = self._histograms.setdefault(name, (help_text, label, {}))
+                family[2].setdefault(label_value, Histogram())
+        return family[2][label_value]
+
+    def gauge(self, name, fn, help_text="", label=None):
+        """fn wird beim Rendern aufgerufen; mit label liefert fn ein Dict label_value -> Wert."""
+        self._gauges[name] = (help_text, label, fn)
+
+    def render(self):
+        lines = []
+        with self._lock:  # neue Stufen können gleichzeitig aus anderen Threads dazukommen
+            histograms = [(name, help_text, label, sorted(family.items()))
+                          for name, (help_text, label, family) in sorted(self._histograms.items())]
+        for name, help_text, label, family in histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for label_value, hist in family:
+                counts, total, count = hist.snapshot()
+                cumulative = 0
+                for bound, n in zip(hist.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{label}="{label_value}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}="{label_value}"}} {total}')
+                lines.append(f'{name}_count{{{label}="{label_value}"}} {count}')
+        for name, (help_text, label, fn) in sorted(self._gauges.items()):
+            try:
+                value = fn()
+            except Exception as e:  # Metriken dürfen den Server nie stören
+                print(f"Metric {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            if label is None:
+                lines.append(f"{name} {value}")
+            else:
+                for label_value, v in sorted(value.items()):
+                    lines.append(f'{name}{{{label}="{label_value}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_METRIC = "fraud_stage_seconds"
+STAGE_HELP = "Latency per pipeline stage"
+
+
+def observe(stage, seconds):
+    REGISTRY.histogram(STAGE_METRIC, stage, STAGE_HELP).observe(seconds)
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def render():
+    return REGISTRY.render()
+
+
+# ---- Gauges, die mehrere Module teilen ----
+
+_active_calls = 0
+_queues = weakref.WeakSet()
+_queues_lock = threading.Lock()  # /metrics kann aus einem anderen Thread (Flask) rendern
+
+
+@contextmanager
+def active_call():
+    """with active_call(): ... zählt laufende Calls für fraud_active_calls."""
+    global _active_calls
+    _active_calls += 1
+    try:
+        yield
+    finally:
+        _active_calls -= 1
+
+
+def register_queue(queue):
+    """BoundedQueues melden sich hier an; fraud_queue_depth summiert pro Queue-Name."""
+    with _queues_lock:
+        _queues.add(queue)
+
+
+def _queue_depths():
+    depths = {}
+    with _queues_lock:
+        queues = list(_queues)
+    for queue in queues:
+        depths[queue.name] = depths.get(queue.name, 0) + queue.qsize()
+    return depths
+
+
+REGISTRY.gauge("fraud_active_calls", lambda: _active_calls, "Twilio streams currently connected")
+REGISTRY.gauge("fraud_queue_depth", _queue_depths, "Items waiting in per-call queues, summed over calls",
+               label="queue")
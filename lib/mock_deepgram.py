@@ -0,0 +1,154 @@
+"""
+Lokaler Ersatz für Deepgram (Agent- und Listen-API) für Lasttests.
+
+Zählt die eingehenden μ-law-Bytes und antwortet nach festen Audio-Intervallen
+mit gescripteten Events:
+  - /v1/agent/converse: Welcome + SettingsApplied nach den Settings, dann alle
+    --analysis-seconds ein "assistant"-Event mit prompt_response (Fraud-JSON)
+  - /v1/listen: alle --transcript-seconds ein PartialTranscript, jedes n-te
+    (--final-every) als FinalTranscript (mit start/duration in Stream-Sekunden)
+
+Server gegen den Mock starten:
+    python mock_deepgram.py --port 8765
+    DEEPGRAM_AGENT_URL=ws://localhost:8765/v1/agent/converse python main.py
+    DEEPGRAM_URL=ws://localhost:8765/v1/listen python websocket_client.py
+
+--script datei.json: {"analyses": [{...}, ...], "transcripts": ["...", ...]}
+"""
+import argparse
+import asyncio
+import json
+
+import websockets
+
+BYTES_PER_SECOND = 8000  # μ-law, 8kHz, mono
+
+DEFAULT_SCRIPT = {
+    "analyses": [
+        {"is_fraudulent": False, "fraud_type": "none", "confidence": "low",
+         "reasoning": "Caller introduces themselves and asks about an order."},
+        {"is_fraudulent": True, "fraud_type": "content", "confidence": "medium",
+         "reasoning": "Caller creates urgency around a blocked account."},
+        {"is_fraudulent": True, "fraud_type": "both", "confidence": "high",
+         "reasoning": "Caller asks for the verification code; voice sounds synthetic."},
+    ],
+    "transcripts": [
+        "hello this is your bank calling",
+        "we noticed unusual activity on your account",
+        "please verify your password",
+        "we need you to transfer the money today",
+    ],
+}
+
+
+class MockSession:
+    def __init__(self, websocket, script, args):
+        self.ws = websocket
+        self.script = script
+        self.args = args
+        self.bytes_received = 0
+        self.events_sent = 0
+
+    async def send_event(self, event):
+        if self.args.delay_ms > 0:
+            await asyncio.sleep(self.args.delay_ms / 1000)
+        await self.ws.send(json.dumps(event))
+        self.events_sent += 1
+
+    async def run_agent(self):
+        interval = int(self.args.analysis_seconds * BYTES_PER_SECOND)
+        next_at = interval
+        async for message in self.ws:
+            if isinstance(message, str):
+                msg = json.loads(message)
+                if msg.get("type") == "Settings":
+                    await self.ws.send(json.dumps({"type": "Welcome", "request_id": "mock"}))
+                    await self.ws.send(json.dumps({"type": "SettingsApplied"}))
+                continue  # KeepAlive u.ä.
+            self.bytes_received += len(message)
+            while self.bytes_received >= next_at:
+                analysis = self.script["analyses"][self.events_sent % len(self.script["analyses"])]
+                await self.send_event({"type": "assistant", "prompt_response": json.dumps(analysis)})
+                if self.args.tts_bytes > 0:
+                    await self.ws.send(b"\xff" * self.args.tts_bytes)  # μ-law Stille
+                next_at += interval
+
+    async def run_listen(self):
+        interval = int(self.args.transcript_seconds * BYTES_PER_SECOND)
+        next_at = interval
+        segment_start = 0.0
+        words = []
+        partials = 0
+        async for message in self.ws:
+            if isinstance(message, str):
+                continue  # KeepAlive / CloseStream
+            self.bytes_received += len(message)
+            while self.bytes_received >= next_at:
+                text = self.script["transcripts"][partials % len(self.script["transcripts"])]
+                words.append(text)
+                partials += 1
+                now = next_at / BYTES_PER_SECOND
+                is_final = partials % self.args.final_every == 0
+                await self.send_event({
+                    "type": "FinalTranscript" if is_final else "PartialTranscript",
+                    "start": segment_start,
+                    "duration": now - segment_start,
+                    "channel": {"alternatives": [{
+                        "transcript": " ".join(words),
+                        "speakers": [{"label": "Speaker 0"}],
+                    }]},
+                })
+                if is_final:
+                    words = []
+                    segment_start = now
+                next_at += interval
+
+
+def make_handler(script, args):
+    async def handler(websocket, path):
+        session = MockSession(websocket, script, args)
+        mode = "listen" if path.startswith("/v1/listen") else "agent"
+        try:
+            if mode == "listen":
+                await session.run_listen()
+            else:
+                await session.run_agent()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        if args.verbose:
+            print(f"[mock] {mode} session closed: {session.bytes_received / BYTES_PER_SECOND:.1f}s audio, "
+                  f"{session.events_sent} events")
+    return handler
+
+
+async def serve(args):
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = {**DEFAULT_SCRIPT, **json.load(f)}
+    # Clients schicken subprotocols=["token", key]; "token" annehmen wie Deepgram
+    async with websockets.serve(make_handler(script, args), args.host, args.port, subprotocols=["token"]):
+        print(f"Mock Deepgram listening on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON-Datei mit analyses/transcripts")
+    parser.add_argument("--analysis-seconds", type=float, default=2.0)
+    parser.add_argument("--transcript-seconds", type=float, default=1.0)
+    parser.add_argument("--final-every", type=int, default=3, help="jedes n-te Transkript ist final")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="simulierte Verarbeitungszeit pro Event")
+    parser.add_argument("--tts-bytes", type=int, default=0, help="μ-law-Bytes TTS-Antwort pro Analyse")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,42 +2,82 @@ import os
 import torch
 import sys
 import json
+import threading
 
-print("Aktueller Arbeitsordner:", os.getcwd())
-
-# Pfad zur JSON-Konfigurationsdatei
+# Pfade relativ zum Projekt-Root
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 config_path = os.path.join(project_root, 'aasist', 'config', 'AASIST.conf')
-print(config_path)
-
-with open(config_path, 'r') as f:
-    config = json.load(f)
+aasist_path = os.path.join(project_root, 'aasist')
+model_path = os.path.join(project_root, 'models', 'weights', 'AASIST.pth')
 
-model_config = config["model_config"]
+# "int8": dynamisch quantisiertes Modell für CPU-Boxen, "none": fp32
+QUANTIZE = os.getenv("SPOOF_QUANTIZE", "none")
 
-# AASIST Pfad ins System einfügen
-aasist_path = os.path.join(project_root, 'aasist')
-sys.path.append(aasist_path)
+# Dynamische Quantisierung gibt es nur auf der CPU
+device = "cuda" if torch.cuda.is_available() and QUANTIZE == "none" else "cpu"
 
-from models.AASIST import Model
+# Dummy-Forward nach dem Laden, damit der erste echte Call keine Allocator-/Init-Kosten trägt
+WARMUP = os.getenv("SPOOF_WARMUP", "1") == "1"
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
+_models = {}
+_lock = threading.Lock()
 
-# Modell initialisieren
-model = Model(model_config).to(device)
 
-# Pfad zum Modellgewicht
-model_path = os.path.join(project_root, 'models', 'weights', 'AASIST.pth')
+def _build_model(model_device):
+    print(f"Lade AASIST-Konfiguration: {config_path}")
+    with open(config_path, 'r') as f:
+        config = json.load(f)
 
-# Gewichte laden
-model.load_state_dict(torch.load(model_path, map_location=device))
-model.eval()
+    # AASIST Pfad ins System einfügen
+    if aasist_path not in sys.path:
+        sys.path.append(aasist_path)
+    from models.AASIST import Model
 
-print("Modell erfolgreich geladen.")
+    model = Model(config["model_config"])
 
-# Exportiere das Modell, damit andere Dateien es importieren können
-def get_model():
+    # mmap: Gewichte kommen direkt aus dem Page-Cache; geforkte Worker teilen sich
+    # die Seiten, statt jeweils eine eigene Kopie zu halten. assign=True übernimmt
+    # die gemappten Tensoren, statt sie in neu allokierte Parameter zu kopieren.
+    state_dict = torch.load(model_path, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state_dict, assign=True)
+    model.to(model_device)
+    model.eval()
     return model
 
+
+def _quantize(model):
+    # int8 für alle nn.Linear, das umfasst auch die Projektionen der Graph-Attention-Layer.
+    # Die Conv-Layer des Encoders bleiben fp32 (dynamische Quantisierung kann keine Convs).
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def warm_up(model, model_device, batch_size=1):
+    with torch.no_grad():
+        model(torch.zeros(batch_size, 32000, device=model_device))
+
+
+def get_model(quantized=None):
+    """
+    Lädt das Modell beim ersten Aufruf (thread-safe) und gibt danach dieselbe Instanz zurück.
+    quantized: True/False erzwingt int8/fp32, None folgt SPOOF_QUANTIZE.
+    """
+    if quantized is None:
+        quantized = QUANTIZE == "int8"
+    key = "int8" if quantized else "fp32"
+    if key not in _models:
+        with _lock:
+            if key not in _models:
+                if quantized:
+                    model_device = "cpu"
+                    model = _quantize(_build_model(model_device))
+                else:
+                    model_device = device
+                    model = _build_model(model_device)
+                if WARMUP:
+                    warm_up(model, model_device)
+                print(f"Modell erfolgreich geladen ({key}).")
+                _models[key] = model
+    return _models[key]
+
 def get_device():
     return device
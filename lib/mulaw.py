@@ -0,0 +1,65 @@
+import numpy as np
+
+
+def _build_decode_table():
+    """
+    G.711 μ-law -> linear PCM für alle 256 Codes, skaliert auf [-1, 1).
+    Entspricht audioop.ulaw2lin / der Referenzimplementierung (g711.c).
+    """
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    samples = np.where(codes & 0x80, -magnitude, magnitude)
+    return (samples / 32768.0).astype(np.float32)
+
+
+MULAW_DECODE_TABLE = _build_decode_table()
+MULAW_DECODE_TABLE.setflags(write=False)
+
+# Encoder arbeitet wie die Referenz (g711.c) mit 14-bit-Werten
+_MULAW_BIAS = 0x21
+_MULAW_CLIP = 8158
+
+
+def decode_mulaw(chunk, out=None):
+    """
+    Dekodiert einen μ-law Chunk (bytes/bytearray/memoryview) per Lookup-Table.
+    Der Eingabepuffer wird nicht kopiert; out kann ein vorallokiertes float32-Array sein.
+    """
+    codes = np.frombuffer(chunk, dtype=np.uint8)
+    return np.take(MULAW_DECODE_TABLE, codes, out=out)
+
+
+def decode_mulaw_batch(chunks, out=None):
+    """
+    Dekodiert viele Chunks hintereinander in ein einziges float32-Array.
+    out: optional vorallokiertes Array, das groß genug für alle Chunks ist.
+    Gibt die beschriebene Sicht auf out zurück.
+    """
+    total = sum(len(chunk) for chunk in chunks)
+    if out is None:
+        out = np.empty(total, dtype=np.float32)
+    elif out.shape[0] < total:
+        raise ValueError(f"Output buffer too small: {out.shape[0]} < {total}")
+
+    pos = 0
+    for chunk in chunks:
+        n = len(chunk)
+        decode_mulaw(chunk, out=out[pos:pos + n])
+        pos += n
+    return out[:pos]
+
+
+def encode_mulaw(samples):
+    """
+    float32 in [-1, 1] -> G.711 μ-law bytes (Umkehrung von decode_mulaw, wie audioop.lin2ulaw).
+    Nur für Tools (Lasttest, Testdaten); im Server wird nur dekodiert.
+    """
+    pcm = np.clip(np.round(np.asarray(samples, dtype=np.float32) * 32768.0), -32768, 32767).astype(np.int32) >> 2
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), _MULAW_CLIP) + _MULAW_BIAS
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    mantissa = (magnitude >> (exponent + 1)) & 0x0F
+    codes = ~(sign | (exponent << 4) | mantissa) & 0xFF
+    return codes.astype(np.uint8).tobytes()
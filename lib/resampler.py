@@ -0,0 +1,70 @@
+import functools
+
+import torch
+import torch.nn.functional as F
+import torchaudio
+
+
+@functools.lru_cache(maxsize=None)
+def get_resample_kernel(orig_freq, new_freq, device):
+    """
+    Sinc-Kernel von torchaudio, einmal pro (Raten, Device) berechnet.
+    Gibt (kernel [new, 1, 2*width + orig], width, orig, new) mit gekürzten Raten zurück.
+    """
+    resampler = torchaudio.transforms.Resample(orig_freq=orig_freq, new_freq=new_freq).to(device)
+    return resampler.kernel, resampler.width, orig_freq // resampler.gcd, new_freq // resampler.gcd
+
+
+def normalize_peak(audio, out=None):
+    # aminmax statt abs().max(), damit kein temporärer Tensor in Fenstergröße entsteht
+    low, high = torch.aminmax(audio)
+    return torch.div(audio, torch.maximum(high, -low) + 1e-9, out=out)
+
+
+class StreamingResampler:
+    """
+    Resampler pro Call, der den Filterzustand über Chunk-Grenzen mitnimmt.
+    Liefert dieselben Samples wie torchaudio auf dem gesamten Signal, nur um
+    `width` Eingangssamples verzögert (bei 8k -> 16k unter 1 ms).
+
+    normalize: "window" (Peak über das ganze Fenster, siehe normalize_window),
+               "chunk" (altes Verhalten, Peak pro Chunk) oder "none"
+    """
+
+    def __init__(self, orig_freq=8000, new_freq=16000, device="cpu", normalize="window"):
+        self.kernel, self.width, self.orig, self.new = get_resample_kernel(orig_freq, new_freq, str(device))
+        self.device = device
+        self.normalize = normalize
+        # entspricht dem linken Zero-Padding von torchaudio.functional.resample
+        self._history = torch.zeros(self.width, device=device)
+
+    def process(self, samples):
+        """Nimmt einen 1D-Chunk mit orig_freq und gibt alle fertigen Samples mit new_freq zurück."""
+        buf = torch.cat([self._history, samples.to(self.device)])
+        kernel_len = self.kernel.shape[-1]
+        if buf.shape[0] < kernel_len:
+            self._history = buf
+            return buf.new_empty(0)
+
+        frames = (buf.shape[0] - kernel_len) // self.orig + 1
+        out = F.conv1d(buf.view(1, 1, -1), self.kernel, stride=self.orig)  # [1, new, frames]
+        self._history = buf[frames * self.orig:]
+        out = out.transpose(1, 2).reshape(-1)
+
+        if self.normalize == "chunk" and out.numel():
+            out = normalize_peak(out)
+        return out
+
+    def reset(self):
+        """Filterzustand verwerfen, z.B. nach einer Lücke im Stream."""
+        self._history = torch.zeros(self.width, device=self.device)
+
+    def flush(self):
+        """Gibt die zurückgehaltenen Samples am Stream-Ende aus (rechtes Zero-Padding)."""
+        return self.process(torch.zeros(self.width + self.orig, device=self.device))
+
+    def normalize_window(self, window, out=None):
+        """out: optionaler Staging-Tensor, der pro Call wiederverwendet wird."""
+        if self.normalize == "window":
+            return normalize_peak(window, out=out)
+        return window
@@ -0,0 +1,101 @@
+import torch
+
+
+class AudioRingBuffer:
+    """
+    Vorallokierter Ringpuffer fester Größe für 1D-Audio.
+
+    Jedes Sample liegt doppelt im Speicher (Index i und i + capacity), dadurch
+    sind die jeweils letzten n Samples immer ein zusammenhängender Bereich und
+    window() kann eine View ohne Kopie oder torch.cat zurückgeben.
+    """
+
+    def __init__(self, capacity, device="cpu", dtype=torch.float32):
+        self.capacity = capacity
+        self._data = torch.zeros(2 * capacity, device=device, dtype=dtype)
+        self._pos = 0  # nächste Schreibposition in [0, capacity)
+        self.size = 0  # gültige Samples, höchstens capacity
+        self.total_written = 0
+
+    def __len__(self):
+        return self.size
+
+    def write(self, samples):
+        """Schreibt samples in-place; bei Überlauf werden die ältesten Samples überschrieben."""
+        n = samples.shape[0]
+        self.total_written += n
+        cap = self.capacity
+        if n >= cap:
+            samples = samples[n - cap:]
+            self._data[:cap].copy_(samples)
+            self._data[cap:].copy_(samples)
+            self._pos = 0
+            self.size = cap
+            return
+
+        end = self._pos + n
+        if end <= cap:
+            self._data[self._pos:end].copy_(samples)
+            self._data[self._pos + cap:end + cap].copy_(samples)
+        else:
+            first = cap - self._pos
+            self._data[self._pos:cap].copy_(samples[:first])
+            self._data[self._pos + cap:].copy_(samples[:first])
+            self._data[:n - first].copy_(samples[first:])
+            self._data[cap:cap + n - first].copy_(samples[first:])
+        self._pos = end % cap
+        self.size = min(cap, self.size + n)
+
+    def window(self, n=None):
+        """
+        View auf die letzten n Samples (Default: alle gültigen).
+        Die View ist nur bis zum nächsten write() gültig.
+        """
+        n = self.size if n is None else n
+        if n > self.size:
+            raise ValueError(f"Requested {n} samples, only {self.size} buffered")
+        end = self._pos + self.capacity
+        return self._data[end - n:end]
+
+    def clear(self):
+        self.size = 0
+
+
+class SlidingWindow:
+    """
+    Zerlegt einen Audiostream in Fenster von window_samples alle hop_samples.
+
+    push() schreibt die Samples in einen AudioRingBuffer und liefert für jedes
+    fällige Fenster (view, start, end) mit Sample-Offsets im Stream. Die View
+    muss verarbeitet sein, bevor der Generator weiterläuft.
+    """
+
+    def __init__(self, window_samples, hop_samples, device="cpu"):
+        if hop_samples < 1:
+            raise ValueError(f"hop_samples must be at least 1, got {hop_samples}")
+        self.window_samples = window_samples
+        self.hop_samples = hop_samples
+        self.buffer = AudioRingBuffer(window_samples, device)
+        self._next_end = window_samples  # Stream-Position, an der das nächste Fenster fällig ist
+
+    def restart(self, position):
+        """
+        Lücke im Stream (z.B. verworfene Chunks): Pufferinhalt verwerfen und bei
+        Stream-Position position neu anfangen. Das nächste Fenster enthält nur
+        Audio ab position, wird also nie über die Lücke hinweg zusammengeklebt.
+        """
+        self.buffer.clear()
+        self.buffer.total_written = position
+        self._next_end = position + self.window_samples
+
+    def push(self, samples):
+        pos = 0
+        n = samples.shape[0]
+        while pos < n:
+            take = min(n - pos, self._next_end - self.buffer.total_written)
+            self.buffer.write(samples[pos:pos + take])
+            pos += take
+            if self.buffer.total_written == self._next_end:
+                end = self._next_end
+                self._next_end += self.hop_samples
+                yield self.buffer.window(), end - self.window_samples, end
@@ -0,0 +1,203 @@
+"""
+Offline-Scoring ganzer Ordner mit aufgezeichneten Calls (WAV / rohes μ-law).
+
+Nutzt dieselbe Kette wie der Live-Pfad: read_audio_file -> speech_audio
+(VoiceActivityGate + StreamingResampler) -> iter_windows (SlidingWindow)
+-> score_windows mit dem Modell aus model_loader (SPOOF_QUANTIZE,
+SPOOF_HOP_SECONDS, SPOOF_VAD usw. gelten). Die VAD ist wie live an, damit
+hier abgestimmte Schwellen auf den Live-Server passen; --no-vad schaltet sie ab.
+
+- Dekodieren/VAD/Resamplen läuft in --workers Prozessen (zurück kommt nur das
+  16kHz-Audio, nicht die überlappenden Fenster), Fensterbildung und Inferenz
+  im Hauptprozess mit großen Batches über Dateigrenzen hinweg. Fenster werden
+  direkt in den festen Batch-Puffer geschrieben, nie alle Fenster einer Datei.
+- Ausgabe ist JSONL, eine Zeile pro Fenster:
+      {"file": ..., "start": s, "end": s, "score": p}
+  gefolgt von {"file": ..., "done": true, "windows": n} pro Datei.
+  Zeilen einer Datei werden erst geschrieben, wenn sie komplett bewertet ist.
+- --resume überspringt Dateien mit done-Zeile und schneidet einen halb
+  geschriebenen Rest am Dateiende ab.
+
+    python score_calls.py recordings/ -o scores.jsonl --workers 4 --batch-size 64
+    python score_calls.py recordings/ -o scores.jsonl --resume
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+
+from anti_spoofing import VAD_ENABLED, WINDOW_SAMPLES, copy_window, iter_windows, score_windows, speech_audio
+from audio_files import find_audio_files, read_audio_file
+from model_loader import get_device, get_model
+
+
+def _init_decoder():
+    # Decoder-Prozesse sollen nicht mit den Inferenz-Threads um Cores konkurrieren
+    torch.set_num_threads(1)
+
+
+def prepare_file(path, vad):
+    """Läuft im Decoder-Prozess: Datei -> (16kHz-Audio als float32-Array, Samplerate, VAD-Gate, Dauer)."""
+    try:
+        samples, sample_rate = read_audio_file(path)
+        audio, gate = speech_audio(samples, sample_rate, vad)
+        return path, audio.numpy(), sample_rate, gate, len(samples) / sample_rate, None
+    except Exception as e:
+        return path, None, None, None, 0.0, f"{type(e).__name__}: {e}"
+
+
+def load_done_files(output_path):
+    """
+    Liest eine bestehende Ausgabe und gibt die fertig bewerteten Dateien zurück.
+    Alles nach der letzten done-Zeile gehört zu einer abgebrochenen Datei und wird abgeschnitten.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    keep = 0
+    with open(output_path, "rb") as f:
+        pos = 0
+        for line in f:
+            pos += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # halb geschriebene Zeile
+            if record.get("done"):
+                done.add(record["file"])
+                keep = pos
+    if keep < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(keep)
+    return done
+
+
+class FileState:
+    def __init__(self, path, duration):
+        self.path = path
+        self.duration = duration
+        self.spans = []
+        self.scores = []
+        self.remaining = 0       # Fenster im Batch-Puffer, noch ohne Score
+        self.complete = False    # alle Fenster der Datei sind im Puffer gelandet
+
+
+class BatchScorer:
+    """Sammelt Fenster mehrerer Dateien in einem festen Batch-Puffer und schreibt fertige Dateien."""
+
+    def __init__(self, model, device, batch_size, out):
+        self.model = model
+        self.device = device
+        self.batch = torch.empty(batch_size, WINDOW_SAMPLES)
+        self.owners = []
+        self.out = out
+        self.windows_scored = 0
+        self.inference_time = 0.0
+
+    def add_file(self, state, windows):
+        """windows: Iterator aus iter_windows(); jedes Fenster wird direkt in den Batch-Puffer kopiert."""
+        for window, span in windows:
+            copy_window(window, self.batch[len(self.owners)])
+            self.owners.append((state, len(state.spans)))
+            state.spans.append(span)
+            state.scores.append(None)
+            state.remaining += 1
+            if len(self.owners) == self.batch.shape[0]:
+                self.flush()
+        state.complete = True
+        if state.remaining == 0:
+            self._write(state)
+
+    def flush(self):
+        if not self.owners:
+            return
+        start = time.perf_counter()
+        scores = score_windows(self.model, self.batch[:len(self.owners)].to(self.device))
+        self.inference_time += time.perf_counter() - start
+        self.windows_scored += len(self.owners)
+        for (state, i), score in zip(self.owners, scores):
+            state.scores[i] = score
+            state.remaining -= 1
+            if state.remaining == 0 and state.complete:
+                self._write(state)
+        self.owners = []
+
+    def _write(self, state):
+        lines = [json.dumps({"file": state.path, "start": start, "end": end, "score": score})
+                 for (start, end), score in zip(state.spans, state.scores)]
+        lines.append(json.dumps({"file": state.path, "done": True, "windows": len(state.spans),
+                                 "duration": state.duration}))
+        self.out.write("\n".join(lines) + "\n")
+        self.out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Audiodateien oder Ordner (.wav, .ulaw, ...)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL-Ausgabe")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Decoder-Prozesse")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--hop-seconds", type=float, default=None, help="Default: SPOOF_HOP_SECONDS")
+    parser.add_argument("--threads", type=int, default=0, help="torch-Threads für die Inferenz (0 = Default)")
+    parser.add_argument("--resume", action="store_true", help="fertige Dateien aus --output überspringen")
+    parser.add_argument("--no-vad", dest="vad", action="store_false", default=VAD_ENABLED,
+                        help="ohne VAD bewerten (Default wie live: SPOOF_VAD)")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.paths)
+    done = load_done_files(args.output) if args.resume else set()
+    todo = [path for path in files if path not in done]
+    print(f"{len(files)} files, {len(done)} already scored, {len(todo)} to go")
+    if not todo:
+        return
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = get_model()
+    device = get_device()
+
+    errors = 0
+    audio_seconds = 0.0
+    wall = time.perf_counter()
+    with open(args.output, "a" if args.resume else "w") as out, \
+            ProcessPoolExecutor(args.workers, initializer=_init_decoder) as executor:
+        scorer = BatchScorer(model, device, args.batch_size, out)
+        # Begrenzt, wie viele dekodierte Dateien gleichzeitig im Speicher liegen
+        in_flight = deque()
+        files_iter = iter(todo)
+        for path in files_iter:
+            in_flight.append(executor.submit(prepare_file, path, args.vad))
+            if len(in_flight) >= args.workers * 2:
+                break
+        completed = 0
+        while in_flight:
+            path, audio, sample_rate, gate, duration, error = in_flight.popleft().result()
+            next_path = next(files_iter, None)
+            if next_path is not None:
+                in_flight.append(executor.submit(prepare_file, next_path, args.vad))
+            completed += 1
+            if error is not None:
+                errors += 1
+                print(f"Skipping {path}: {error}")
+                continue
+            audio_seconds += duration
+            windows = iter_windows(torch.from_numpy(audio), sample_rate, gate, args.hop_seconds)
+            scorer.add_file(FileState(path, duration), windows)
+            if completed % 100 == 0:
+                elapsed = time.perf_counter() - wall
+                print(f"{completed}/{len(todo)} files, {audio_seconds / elapsed:.1f}x real time")
+        scorer.flush()
+
+    wall = time.perf_counter() - wall
+    print(f"Scored {len(todo) - errors} files ({errors} errors), {scorer.windows_scored} windows, "
+          f"{audio_seconds:.0f}s audio in {wall:.1f}s ({audio_seconds / max(wall, 1e-9):.1f}x real time, "
+          f"inference {scorer.inference_time:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
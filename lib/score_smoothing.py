@@ -0,0 +1,28 @@
+import collections
+
+
+class ScoreSmoother:
+    """
+    Glättet die Spoof-Scores eines Calls über die Zeit.
+
+    mode: "ema"  - exponentieller gleitender Mittelwert mit Faktor alpha
+          "max"  - Maximum über die letzten max_windows Fenster
+          "none" - Rohwert durchreichen
+    """
+
+    def __init__(self, mode="none", alpha=0.5, max_windows=4):
+        if mode not in ("ema", "max", "none"):
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        self.mode = mode
+        self.alpha = alpha
+        self._ema = None
+        self._recent = collections.deque(maxlen=max_windows)
+
+    def update(self, score):
+        if self.mode == "ema":
+            self._ema = score if self._ema is None else self.alpha * score + (1 - self.alpha) * self._ema
+            return self._ema
+        if self.mode == "max":
+            self._recent.append(score)
+            return max(self._recent)
+        return score
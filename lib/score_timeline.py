@@ -0,0 +1,63 @@
+import os
+from bisect import bisect_left, bisect_right
+
+# ~1h bei 2s-Fenstern ohne Überlappung
+TIMELINE_WINDOWS = int(os.getenv("SPOOF_TIMELINE_WINDOWS", "1800"))
+
+
+class ScoreTimeline:
+    """
+    Spoof-Scores eines Calls, sortiert nach Stream-Zeit (Sekunden).
+
+    Scores kommen vom anti_spoofing_worker in aufsteigender Reihenfolge, add()
+    hängt dann nur an; ältere Einträge werden gesammelt gelöscht, sobald die
+    Liste doppelt so lang wie maxlen ist (amortisiert O(1), Speicher begrenzt).
+    query(start, end) findet die überlappenden Fenster per Binärsuche.
+    """
+
+    def __init__(self, maxlen=TIMELINE_WINDOWS):
+        self.maxlen = maxlen
+        self._starts = []
+        self._ends = []
+        self._scores = []
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, start, end, score):
+        if self._starts and start < self._starts[-1]:
+            # Sollte nicht vorkommen, bleibt aber korrekt sortiert
+            i = bisect_right(self._starts, start)
+            self._starts.insert(i, start)
+            self._ends.insert(i, end)
+            self._scores.insert(i, score)
+        else:
+            self._starts.append(start)
+            self._ends.append(end)
+            self._scores.append(score)
+        if len(self._starts) >= 2 * self.maxlen:
+            drop = len(self._starts) - self.maxlen
+            del self._starts[:drop]
+            del self._ends[:drop]
+            del self._scores[:drop]
+
+    def add_result(self, result):
+        """Nimmt ein Ergebnis-Dict des anti_spoofing_worker."""
+        self.add(result["start"], result["end"], result["score"])
+
+    def query(self, start, end):
+        """Alle Fenster, die [start, end] überlappen, als [(start, end, score), ...]."""
+        # Fensterenden steigen mit den Anfängen, daher reicht je eine Binärsuche
+        lo = bisect_right(self._ends, start)
+        hi = bisect_left(self._starts, end)
+        return list(zip(self._starts[lo:hi], self._ends[lo:hi], self._scores[lo:hi]))
+
+    def max_score(self, start, end):
+        """Höchster Score im Zeitraum oder None, wenn (noch) kein Fenster passt."""
+        lo = bisect_right(self._ends, start)
+        hi = bisect_left(self._starts, end)
+        return max(self._scores[lo:hi]) if hi > lo else None
+
+    @property
+    def last_end(self):
+        return self._ends[-1] if self._ends else 0.0
@@ -1,16 +1,44 @@
 import asyncio
-import base64
-import json
 import websockets
 import os
-import torch
 import sys
+import datetime
+import http
+import time
+from urllib.parse import urlsplit
 
 from model_loader import get_model, get_device
-from anti_spoofing import load_model, anti_spoofing_worker
+from anti_spoofing import anti_spoofing_worker
+from inference_scheduler import InferenceScheduler
+from inference_pool import InferencePool
+from chunker import AudioChunker
+from twilio_frames import TwilioFrameDecoder
+from bounded_queue import (BoundedQueue, DROP_OLDEST, AUDIO_QUEUE_SIZE, RESULTS_QUEUE_SIZE,
+                           OVERFLOW_POLICY, RESULTS_OVERFLOW_POLICY)
+from alert_broadcaster import AlertBroadcaster, client_handler
+from call_recorder import RECORDER
+import metrics
+from metrics import active_call, observe
 
-model = get_model()
 device = get_device()
+
+# "thread": Resampling + Inferenz im Thread-Pool, "inline": direkt im Eventloop
+EXECUTION_MODE = os.getenv("SPOOF_EXECUTION_MODE", "thread")
+POOL_SIZE = int(os.getenv("SPOOF_POOL_SIZE", "2"))
+TORCH_THREADS = int(os.getenv("SPOOF_TORCH_THREADS", "0")) or None
+STATS_INTERVAL = float(os.getenv("SPOOF_STATS_INTERVAL", "0"))  # Sekunden, 0 = aus
+pool = InferencePool(POOL_SIZE, TORCH_THREADS) if EXECUTION_MODE == "thread" else None
+
+# Gemeinsamer Batch-Scheduler für alle Calls (SPOOF_MAX_BATCH_SIZE=1 schaltet Batching ab)
+MAX_BATCH_SIZE = int(os.getenv("SPOOF_MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("SPOOF_MAX_WAIT_MS", "20"))
+scheduler = None  # wird in main() erstellt, sobald das Modell geladen ist
+
+# Zustandslos, kann von allen Calls geteilt werden
+frame_decoder = TwilioFrameDecoder()
+
+# Spoof-Scores aller Calls für /client (Dashboard, Lasttest)
+FRAUD_ALERTS = AlertBroadcaster()
 # =======
 # import datetime
 
@@ -34,65 +62,138 @@ device = get_device()
 # >>>>>>> nils
 
 async def twilio_handler(twilio_ws):
-    audio_queue = asyncio.Queue()
-    spoof_results_queue = asyncio.Queue()
-    streamsid_queue = asyncio.Queue()
+    # Begrenzte Queues pro Call; verworfene Elemente landen in queue_counters
+    queue_counters = {}
+    audio_queue = BoundedQueue(AUDIO_QUEUE_SIZE, OVERFLOW_POLICY, "audio", queue_counters)
+    spoof_results_queue = BoundedQueue(RESULTS_QUEUE_SIZE, RESULTS_OVERFLOW_POLICY, "results", queue_counters)
+    streamsid_queue = BoundedQueue(1, DROP_OLDEST, "streamsid", queue_counters)
+    call = {"call_sid": None}
 
     async def twilio_receiver():
         print("twilio_receiver started")
         BUFFER_SIZE = 20 * 160
-        inbuffer = bytearray()
+        chunker = AudioChunker(BUFFER_SIZE)
+        recording = None  # optionale Aufnahme (CALL_RECORDING_DIR)
+        stream_offset = 0  # Bytes seit Streamstart
         async for message in twilio_ws:
             try:
-                data = json.loads(message)
-                if data["event"] == "start":
+                parse_start = time.perf_counter()
+                event, data, audio = frame_decoder.decode(message)
+                observe("frame_parse", time.perf_counter() - parse_start)
+                if event == "media":
+                    if audio is not None:  # nur inbound
+                        for chunk in chunker.feed(audio):
+                            if recording is not None:
+                                recording.append(chunk)
+                            # Mit Stream-Offset, damit der Worker verworfene Chunks erkennt
+                            await audio_queue.put((stream_offset, chunk))
+                            stream_offset += len(chunk)
+                elif event == "start":
                     print("got our streamsid")
                     start = data["start"]
                     streamsid = start["streamSid"]
                     streamsid_queue.put_nowait(streamsid)
-                elif data["event"] == "connected":
+                    call["call_sid"] = start.get("callSid")
+                    FRAUD_ALERTS.publish({
+                        "event": "call_started",
+                        "call_sid": call["call_sid"],
+                        "caller": start.get("customParameters", {}).get("caller"),
+                        "start_time": datetime.datetime.now().isoformat(),
+                    })
+                    if RECORDER is not None:
+                        recording = RECORDER.open_call(call["call_sid"] or streamsid)
+                elif event == "connected":
                     continue
-                elif data["event"] == "media":
-                    media = data["media"]
-                    if media["track"] == "inbound":
-                        chunk = base64.b64decode(media["payload"])
-                        inbuffer.extend(chunk)
-                elif data["event"] == "stop":
+                elif event == "stop":
                     break
-
-                while len(inbuffer) >= BUFFER_SIZE:
-                    chunk = inbuffer[:BUFFER_SIZE]
-                    await audio_queue.put(chunk)
-                    inbuffer = inbuffer[BUFFER_SIZE:]
-            except json.JSONDecodeError:
+            except ValueError:  # JSONDecodeError aller Backends
                 print("Received a non-JSON message, ignoring.")
                 continue
             except websockets.exceptions.ConnectionClosed:
                 print("Twilio connection closed.")
                 break
 
+        if recording is not None:
+            recording.close()
         print("twilio_receiver finished, signaling anti-spoofing worker to stop.")
         await audio_queue.put(None)  # Signal, dass kein Audio mehr kommt
 
     async def run_anti_spoofing():
         print("server started anti-spoofing worker")
-        await anti_spoofing_worker(audio_queue, spoof_results_queue, model)
+        await anti_spoofing_worker(audio_queue, spoof_results_queue, get_model(), scheduler, pool)
+        await spoof_results_queue.put(None)  # Ende für publish_scores
 
-    # Nur die zwei Tasks starten, keine Deepgram-Verbindung mehr
+    async def publish_scores():
+        while True:
+            result = await spoof_results_queue.get()
+            if result is None:
+                break
+            FRAUD_ALERTS.publish({
+                "event": "spoof_score",
+                "call_sid": call["call_sid"],
+                "score": result["score"],
+                "raw_score": result["raw_score"],
+                "start": result["start"],
+                "end": result["end"],
+                "timestamp": datetime.datetime.now().isoformat(),
+            })
+
+    # Nur die Tasks starten, keine Deepgram-Verbindung mehr
     await asyncio.gather(
         twilio_receiver(),
         run_anti_spoofing(),
+        publish_scores(),
     )
 
+    if call["call_sid"] is not None:
+        # Erst nach den letzten Scores, damit der Zustand im Snapshot komplett ist
+        FRAUD_ALERTS.publish({"event": "call_ended", "call_sid": call["call_sid"],
+                              "timestamp": datetime.datetime.now().isoformat()})
+    print(f"Queue counters for this call: {queue_counters}")
     await twilio_ws.close()
 
 async def router(websocket):
+    url = urlsplit(websocket.path)
+    if url.path == "/client":
+        await client_handler(websocket, FRAUD_ALERTS, url.query)
+        return
     print("Starting Twilio handler")
-    await twilio_handler(websocket)
+    with active_call():
+        await twilio_handler(websocket)
+
+async def serve_metrics(path, request_headers):
+    """GET /metrics auf demselben Port wie die Websockets (Prometheus-Textformat)."""
+    if urlsplit(path).path == "/metrics":
+        return http.HTTPStatus.OK, [("Content-Type", metrics.CONTENT_TYPE)], metrics.render().encode()
+    return None  # normaler Websocket-Handshake
+
+async def report_stats():
+    """Gibt regelmäßig die Queue-Tiefen von Scheduler und Pool aus."""
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        if scheduler is not None:
+            print(f"[stats] scheduler: {scheduler.stats()}")
+        if pool is not None:
+            print(f"[stats] pool: {pool.stats()}")
+
+metrics.REGISTRY.gauge("fraud_alert_subscribers", lambda: FRAUD_ALERTS.subscriber_count,
+                       "Connected /client dashboards")
+metrics.REGISTRY.gauge("fraud_scheduler_queue_depth", lambda: scheduler.queue_depth if scheduler else 0,
+                       "Windows waiting for a batch in the InferenceScheduler")
+metrics.REGISTRY.gauge("fraud_pool_queue_depth", lambda: pool.queue_depth if pool else 0,
+                       "Jobs running or waiting in the InferencePool")
 
 async def main():
+    global scheduler
+    # Modell vor dem ersten Call laden und aufwärmen (model_loader lädt lazy)
+    model = get_model()
+    if MAX_BATCH_SIZE > 1:
+        scheduler = InferenceScheduler(model, MAX_BATCH_SIZE, MAX_WAIT_MS, pool)
+
     print("Starting WebSocket server...")
-    async with websockets.serve(router, "localhost", 5000):
+    if STATS_INTERVAL > 0:
+        asyncio.get_running_loop().create_task(report_stats())
+    async with websockets.serve(router, "localhost", 5000, process_request=serve_metrics):
         print("Server is now running on ws://localhost:5000")
         await asyncio.Future()
 
@@ -0,0 +1,81 @@
+// msgpack.js
+// Minimal MessagePack decoder for binary alert frames from /client?encoding=msgpack.
+// Load before calls.js / call.js; without it they fall back to JSON frames.
+function decodeMsgpack(buffer) {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  const textDecoder = new TextDecoder();
+  let pos = 0;
+
+  function str(length) {
+    const value = textDecoder.decode(bytes.subarray(pos, pos + length));
+    pos += length;
+    return value;
+  }
+
+  function bin(length) {
+    const value = bytes.slice(pos, pos + length);
+    pos += length;
+    return value;
+  }
+
+  function array(length) {
+    const value = new Array(length);
+    for (let i = 0; i < length; i++) value[i] = read();
+    return value;
+  }
+
+  function map(length) {
+    const value = {};
+    for (let i = 0; i < length; i++) {
+      const key = read();
+      value[key] = read();
+    }
+    return value;
+  }
+
+  function read() {
+    const type = bytes[pos++];
+    if (type <= 0x7f) return type;                       // positive fixint
+    if (type <= 0x8f) return map(type & 0x0f);           // fixmap
+    if (type <= 0x9f) return array(type & 0x0f);         // fixarray
+    if (type <= 0xbf) return str(type & 0x1f);           // fixstr
+    if (type >= 0xe0) return type - 0x100;               // negative fixint
+
+    let value;
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: { const n = view.getUint8(pos); pos += 1; return bin(n); }
+      case 0xc5: { const n = view.getUint16(pos); pos += 2; return bin(n); }
+      case 0xc6: { const n = view.getUint32(pos); pos += 4; return bin(n); }
+      case 0xca: value = view.getFloat32(pos); pos += 4; return value;
+      case 0xcb: value = view.getFloat64(pos); pos += 8; return value;
+      case 0xcc: value = view.getUint8(pos); pos += 1; return value;
+      case 0xcd: value = view.getUint16(pos); pos += 2; return value;
+      case 0xce: value = view.getUint32(pos); pos += 4; return value;
+      case 0xcf: value = Number(view.getBigUint64(pos)); pos += 8; return value;
+      case 0xd0: value = view.getInt8(pos); pos += 1; return value;
+      case 0xd1: value = view.getInt16(pos); pos += 2; return value;
+      case 0xd2: value = view.getInt32(pos); pos += 4; return value;
+      case 0xd3: value = Number(view.getBigInt64(pos)); pos += 8; return value;
+      case 0xd9: { const n = view.getUint8(pos); pos += 1; return str(n); }
+      case 0xda: { const n = view.getUint16(pos); pos += 2; return str(n); }
+      case 0xdb: { const n = view.getUint32(pos); pos += 4; return str(n); }
+      case 0xdc: { const n = view.getUint16(pos); pos += 2; return array(n); }
+      case 0xdd: { const n = view.getUint32(pos); pos += 4; return array(n); }
+      case 0xde: { const n = view.getUint16(pos); pos += 2; return map(n); }
+      case 0xdf: { const n = view.getUint32(pos); pos += 4; return map(n); }
+    }
+    throw new Error(`Unsupported msgpack type 0x${type.toString(16)}`);
+  }
+
+  return read();
+}
+
+// Turns a /client frame (text or binary) into a list of alerts
+function decodeAlertFrame(data) {
+  const frame = typeof data === "string" ? JSON.parse(data) : decodeMsgpack(data);
+  return frame.event === "batch" ? frame.alerts : [frame];
+}
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+
+# Höchstens ein Partial-Update pro Intervall und Call
+PARTIAL_INTERVAL = float(os.getenv("TRANSCRIPT_PARTIAL_INTERVAL_MS", "150")) / 1000
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TranscriptCoalescer:
+    """
+    Drosselt Partial-Transkripte pro Call und schickt nur das Delta.
+
+    partial(): merkt sich das neueste Partial; gesendet wird sofort, wenn das
+    letzte Update länger als interval her ist, sonst gesammelt am Ende des
+    Intervalls (Zwischenstände fallen weg). Die Nachricht enthält statt des
+    ganzen Texts nur {"keep": n, "append": "..."}: der Browser behält die
+    ersten n Zeichen des vorigen Partials und hängt append an.
+    final(): verwirft ein ausstehendes Partial und schickt das komplette
+    Transkript ("transcript"), damit der Browser-Zustand sicher stimmt.
+
+    Listen-Felder in den Extras (z.B. keywords) werden über gedrosselte
+    Partials hinweg gesammelt, alle anderen Felder nimmt das neueste Partial.
+    send: async callable(dict)
+    """
+
+    def __init__(self, send, interval=PARTIAL_INTERVAL):
+        self._send = send
+        self.interval = interval
+        self._sent_text = ""       # Stand des Browsers
+        self._pending = None       # (text, extras) des neuesten ungesendeten Partials
+        self._last_send = 0.0
+        self._timer = None
+        self.partials_in = 0
+        self.partials_out = 0
+
+    async def partial(self, text, **extras):
+        self.partials_in += 1
+        if self._pending is not None:
+            for key, value in self._pending[1].items():
+                if isinstance(value, list):
+                    extras[key] = value + extras.get(key, [])
+        self._pending = (text, extras)
+        wait = self._last_send + self.interval - time.monotonic()
+        if wait <= 0:
+            await self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(wait, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._timer = None
+        asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await self._flush()
+        except Exception as e:  # z.B. Browser schon weg; der nächste direkte Send meldet es
+            print(f"Deferred partial send failed: {e}")
+
+    async def _flush(self):
+        if self._pending is None:
+            return
+        text, extras = self._pending
+        self._pending = None
+        if text == self._sent_text and not any(isinstance(v, list) and v for v in extras.values()):
+            return  # nichts Neues
+        keep = _common_prefix(self._sent_text, text)
+        self._sent_text = text
+        self._last_send = time.monotonic()
+        self.partials_out += 1
+        await self._send({"is_final": False, "keep": keep, "append": text[keep:], **extras})
+
+    async def final(self, text, **extras):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending is not None:
+            for key, value in self._pending[1].items():
+                if isinstance(value, list):
+                    extras[key] = value + extras.get(key, [])
+        self._pending = None
+        self._sent_text = ""  # nächste Äußerung beginnt leer
+        self._last_send = time.monotonic()
+        await self._send({"is_final": True, "transcript": text, **extras})
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
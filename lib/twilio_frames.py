@@ -0,0 +1,81 @@
+"""
+Decoder für Twilio Media Stream Frames (connected/start/media/mark/stop).
+
+Pro Call kommen ~50 media-Frames pro Sekunde. Statt jedes Frame komplett mit
+json.loads zu parsen und mit base64.b64decode zu dekodieren, sucht der
+Fast-Path in media-Frames nur "track" und "payload" per str.find und gibt
+den Payload direkt an binascii.a2b_base64; outbound wird gar nicht dekodiert.
+Alle anderen Frames (und alles, was der Fast-Path nicht sicher erkennt)
+gehen durch das JSON-Backend: orjson bzw. ujson, wenn installiert, sonst
+die stdlib.
+
+TWILIO_JSON_BACKEND=auto|orjson|ujson|json wählt das Backend,
+TWILIO_FAST_PATH=0 schaltet den Fast-Path ab.
+"""
+import binascii
+import json
+import os
+
+
+def _load_backend(name):
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+            return "orjson", orjson.loads
+        except ImportError:
+            if name == "orjson":
+                raise
+    if name in ("auto", "ujson"):
+        try:
+            import ujson
+            return "ujson", ujson.loads
+        except ImportError:
+            if name == "ujson":
+                raise
+    return "json", json.loads
+
+
+_PAYLOAD_KEY = '"payload":"'
+_INBOUND = '"track":"inbound"'
+_OUTBOUND = '"track":"outbound"'
+
+
+class TwilioFrameDecoder:
+    """
+    decode(message) -> (event, data, audio)
+      event: "start", "media", "stop", ...
+      data:  geparstes JSON-Dict; beim media-Fast-Path None
+      audio: dekodierte μ-law-Bytes bei inbound media, sonst None
+             (outbound-Payloads werden gar nicht erst dekodiert)
+    Nicht-JSON-Nachrichten lösen ValueError aus, wie bei json.loads.
+    """
+
+    def __init__(self, backend=None, fast_path=None):
+        self.backend, self._loads = _load_backend(backend or os.getenv("TWILIO_JSON_BACKEND", "auto"))
+        if fast_path is None:
+            fast_path = os.getenv("TWILIO_FAST_PATH", "1") == "1"
+        self.fast_path = fast_path
+
+    def decode(self, message):
+        if self.fast_path and isinstance(message, str):
+            # Nur media-Frames haben ein "payload"-Feld. Erkannt wird das kompakte
+            # Format, das Twilio schickt; alles andere geht durch das JSON-Backend.
+            start = message.find(_PAYLOAD_KEY)
+            if start != -1:
+                if _INBOUND in message:
+                    start += len(_PAYLOAD_KEY)
+                    end = message.find('"', start)
+                    if end != -1:
+                        # a2b_base64 ignoriert Nicht-Base64-Zeichen, ein escaptes "\/" ist also unkritisch
+                        return "media", None, binascii.a2b_base64(message[start:end])
+                elif _OUTBOUND in message:
+                    return "media", None, None
+
+        data = self._loads(message)
+        event = data.get("event")
+        audio = None
+        if event == "media":
+            media = data["media"]
+            if media.get("track") == "inbound":
+                audio = binascii.a2b_base64(media["payload"])
+        return event, data, audio
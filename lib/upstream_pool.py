@@ -0,0 +1,196 @@
+"""
+Pool vorgewärmter Upstream-Websockets (Deepgram agent/listen).
+
+Ohne Pool öffnet jeder Call beim Start eine neue TLS-Verbindung und schickt
+danach die Settings; das kostet einige hundert Millisekunden bis zum ersten
+Transkript. Der Pool hält `size` Sessions offen und bereits konfiguriert,
+ein neuer Twilio-Stream nimmt sich sofort eine davon.
+
+- Sessions sind einmalig: nach dem Call wird die Verbindung geschlossen
+  (Deepgram-Sessions tragen Gesprächszustand) und im Hintergrund ersetzt.
+- Health-Check: alle `health_interval` Sekunden ping (+ optional KeepAlive,
+  damit Deepgram die idle Session nicht schließt); tote Sessions fliegen raus.
+- Idle-Timeout: Sessions älter als `idle_timeout` werden erneuert.
+- max_size begrenzt alle Verbindungen des Pools: idle + gerade aufgebaute +
+  ausgeliehene. Ist das Limit erreicht, wartet acquire() bis zu
+  acquire_timeout Sekunden auf einen freien Platz und wirft dann RuntimeError.
+- Ist keine warme Session da, wird wie bisher direkt verbunden (cold).
+
+UPSTREAM_POOL_SIZE=0 schaltet das Vorwärmen ab (max_size gilt trotzdem).
+"""
+import asyncio
+import contextlib
+import json
+import os
+import time
+from collections import deque
+
+POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("UPSTREAM_POOL_MAX", "8"))
+IDLE_TIMEOUT = float(os.getenv("UPSTREAM_IDLE_TIMEOUT", "30"))
+HEALTH_INTERVAL = float(os.getenv("UPSTREAM_HEALTH_INTERVAL", "5"))
+ACQUIRE_TIMEOUT = float(os.getenv("UPSTREAM_ACQUIRE_TIMEOUT", "10"))
+PING_TIMEOUT = 2.0
+
+KEEPALIVE_MESSAGE = json.dumps({"type": "KeepAlive"})
+
+
+class UpstreamPool:
+    """
+    connect: () -> awaitable Websocket, z.B. lambda: websockets.connect(url, ...)
+    setup:   optionale Coroutine(ws), die die Session konfiguriert (Settings senden)
+
+    Sessions aus acquire() müssen mit release() zurückgegeben werden (session() macht das).
+    """
+
+    def __init__(self, connect, setup=None, size=POOL_SIZE, max_size=POOL_MAX_SIZE,
+                 idle_timeout=IDLE_TIMEOUT, health_interval=HEALTH_INTERVAL,
+                 keepalive=KEEPALIVE_MESSAGE, name="upstream", acquire_timeout=ACQUIRE_TIMEOUT):
+        self._connect = connect
+        self._setup = setup
+        self.max_size = max_size
+        self.size = min(size, max_size)
+        self.acquire_timeout = acquire_timeout
+        # Ein Platz pro Verbindung (idle, im Aufbau oder ausgeliehen)
+        self._slots = asyncio.Semaphore(max_size)
+        self._in_use = 0
+        self._refilling = None
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.keepalive = keepalive
+        self.name = name
+        self._idle = deque()  # (ws, created_at)
+        self._connecting = 0
+        self._task = None
+        self.counters = {"warm": 0, "cold": 0, "waited": 0, "expired": 0, "unhealthy": 0, "connect_errors": 0}
+
+    async def _open(self):
+        ws = await self._connect()
+        if self._setup is not None:
+            await self._setup(ws)
+        return ws
+
+    async def _discard(self, ws):
+        try:
+            await ws.close()
+        finally:
+            self._slots.release()
+
+    async def _add_one(self):
+        if self._slots.locked():
+            return  # Limit erreicht oder ein Call wartet schon auf einen Platz
+        await self._slots.acquire()
+        self._connecting += 1
+        try:
+            ws = await self._open()
+        except Exception as e:
+            self.counters["connect_errors"] += 1
+            print(f"[{self.name}] Pre-connect failed: {e}")
+            self._slots.release()
+            return
+        finally:
+            self._connecting -= 1
+        self._idle.append((ws, time.monotonic()))
+
+    async def _fill(self):
+        missing = self.size - len(self._idle) - self._connecting
+        if missing > 0:
+            await asyncio.gather(*(self._add_one() for _ in range(missing)))
+
+    async def _check(self):
+        now = time.monotonic()
+        for _ in range(len(self._idle)):
+            ws, created = self._idle.popleft()
+            if now - created > self.idle_timeout:
+                self.counters["expired"] += 1
+                await self._discard(ws)
+                continue
+            try:
+                if self.keepalive is not None:
+                    await ws.send(self.keepalive)
+                await asyncio.wait_for(await ws.ping(), PING_TIMEOUT)
+            except Exception:
+                self.counters["unhealthy"] += 1
+                await self._discard(ws)
+                continue
+            self._idle.append((ws, created))
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check()
+                await self._fill()
+            except Exception as e:
+                print(f"[{self.name}] Pool maintenance error: {e}")
+
+    async def start(self):
+        """Füllt den Pool einmal und startet den Health-Check im laufenden Loop."""
+        if self.size <= 0 or self._task is not None:
+            return
+        await self._fill()
+        self._task = asyncio.create_task(self._maintain())
+        print(f"[{self.name}] Upstream pool ready ({len(self._idle)}/{self.size} warm sessions)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            ws, _ = self._idle.popleft()
+            await self._discard(ws)
+
+    async def acquire(self):
+        """Gibt eine offene, konfigurierte Session zurück (warm wenn möglich)."""
+        while self._idle:
+            ws, created = self._idle.popleft()
+            if ws.open and time.monotonic() - created <= self.idle_timeout:
+                self.counters["warm"] += 1
+                self._in_use += 1
+                self._refill()
+                return ws
+            self.counters["expired"] += 1
+            await self._discard(ws)
+
+        if self._slots.locked():
+            self.counters["waited"] += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"[{self.name}] all {self.max_size} upstream sessions busy") from None
+        self.counters["cold"] += 1
+        try:
+            ws = await self._open()
+        except Exception:
+            self._slots.release()
+            raise
+        self._in_use += 1
+        self._refill()
+        return ws
+
+    async def release(self, ws):
+        """Schließt eine Session aus acquire() und gibt ihren Platz frei."""
+        try:
+            await ws.close()
+        finally:
+            self._in_use -= 1
+            self._slots.release()
+            self._refill()
+
+    def _refill(self):
+        # Höchstens ein Nachfüllen gleichzeitig
+        if self._task is not None and (self._refilling is None or self._refilling.done()):
+            self._refilling = asyncio.create_task(self._fill())
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """async with pool.session() as ws: ... (Ersatz für async with websockets.connect(...))"""
+        ws = await self.acquire()
+        try:
+            yield ws
+        finally:
+            await self.release(ws)
+
+    def stats(self):
+        return {"idle": len(self._idle), "connecting": self._connecting, "in_use": self._in_use,
+                "max_size": self.max_size, **self.counters}
@@ -0,0 +1,99 @@
+import bisect
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """
+    Einfache, vektorisierte VAD auf dem dekodierten 8kHz-Audio eines Calls.
+
+    Das Audio wird in Frames (Default 20 ms) geteilt; ein Frame gilt als Sprache,
+    wenn seine Energie über energy_db (dBFS) liegt und die Zero-Crossing-Rate
+    unter zcr_max. hangover_frames hält das Gate nach Sprache noch offen, damit
+    Silbenenden und Frikative nicht abgeschnitten werden.
+
+    filter() gibt nur die Sprach-Samples zurück. stream_offset() rechnet eine
+    Position im gefilterten Audio zurück auf die Position im Original-Stream.
+    """
+
+    def __init__(self, frame_samples=160, energy_db=-45.0, zcr_max=0.5, hangover_frames=8):
+        self.frame_samples = frame_samples
+        self.energy_threshold = 10 ** (energy_db / 10)  # mittlere Leistung, Vollaussteuerung = 1
+        self.zcr_max = zcr_max
+        self.hangover_frames = hangover_frames
+        self._hangover = 0
+        self._leftover = np.empty(0, dtype=np.float32)
+        self._stream_pos = 0  # Samples im Original-Stream, die schon in Frames zerlegt wurden
+        self._speech_pos = 0  # davon durchgelassene Sprach-Samples
+        # Anker (speech_pos, stream_pos) am Anfang jedes durchgelassenen Abschnitts
+        self._anchor_speech = []
+        self._anchor_stream = []
+        self.frames_total = 0
+        self.frames_skipped = 0
+
+    def speech_mask(self, frames):
+        """frames: [n, frame_samples] -> bool-Array [n], ohne Hangover."""
+        energy = np.einsum("ij,ij->i", frames, frames) / self.frame_samples
+        crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+        zcr = crossings / (self.frame_samples - 1)
+        return (energy > self.energy_threshold) & (zcr < self.zcr_max)
+
+    def filter(self, samples):
+        if self._leftover.size:
+            samples = np.concatenate([self._leftover, samples])
+        n_frames = samples.shape[0] // self.frame_samples
+        usable = n_frames * self.frame_samples
+        self._leftover = samples[usable:].copy()
+        if n_frames == 0:
+            return samples[:0]
+
+        frames = samples[:usable].reshape(n_frames, self.frame_samples)
+        keep = self.speech_mask(frames)
+        # Hangover sequentiell, aber nur über n_frames Booleans (20 pro 0.4s-Chunk)
+        for i in range(n_frames):
+            if keep[i]:
+                self._hangover = self.hangover_frames
+            elif self._hangover > 0:
+                self._hangover -= 1
+                keep[i] = True
+
+        kept = int(np.count_nonzero(keep))
+        self.frames_total += n_frames
+        self.frames_skipped += n_frames - kept
+
+        # Anker für jeden neuen zusammenhängenden Sprachabschnitt merken
+        starts = np.flatnonzero(keep & ~np.concatenate([[False], keep[:-1]]))
+        kept_before = np.cumsum(keep) - keep
+        for i in starts:
+            self._anchor_speech.append(self._speech_pos + int(kept_before[i]) * self.frame_samples)
+            self._anchor_stream.append(self._stream_pos + int(i) * self.frame_samples)
+        self._stream_pos += usable
+        self._speech_pos += kept * self.frame_samples
+
+        if kept == n_frames:
+            return frames.reshape(-1)
+        return frames[keep].reshape(-1)
+
+    @property
+    def speech_pos(self):
+        return self._speech_pos
+
+    def skip_to(self, stream_pos):
+        """Lücke im Stream: ab stream_pos weitermachen, ohne Rest-Samples und Hangover von davor."""
+        self._leftover = self._leftover[:0]
+        self._hangover = 0
+        self._stream_pos = stream_pos
+
+    def stream_offset(self, speech_offset):
+        """Position im gefilterten Audio -> Position im Original-Stream (beide in 8kHz-Samples)."""
+        i = bisect.bisect_right(self._anchor_speech, speech_offset) - 1
+        if i < 0:
+            return speech_offset
+        return self._anchor_stream[i] + (speech_offset - self._anchor_speech[i])
+
+    def trim(self, speech_offset):
+        """Vergisst Anker vor speech_offset; hält die Anker-Listen beschränkt."""
+        i = bisect.bisect_right(self._anchor_speech, speech_offset) - 1
+        if i > 0:
+            del self._anchor_speech[:i]
+            del self._anchor_stream[:i]
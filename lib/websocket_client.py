@@ -2,17 +2,25 @@ import asyncio
 import websockets
 import json
 import os
-import torch
-import numpy as np
-import torchaudio
 
-from anti_spoofing import load_model  # Dein echtes Modell laden
+from anti_spoofing import anti_spoofing_worker
+from model_loader import get_model
+from inference_scheduler import InferenceScheduler
+from inference_pool import InferencePool
+from bounded_queue import (BoundedQueue, AUDIO_QUEUE_SIZE, RESULTS_QUEUE_SIZE,
+                           OVERFLOW_POLICY, RESULTS_OVERFLOW_POLICY)
+from upstream_pool import UpstreamPool
+from score_timeline import ScoreTimeline
+from keyword_matcher import new_stream
+from transcript_coalescer import TranscriptCoalescer
+from metrics import timed
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 if not DEEPGRAM_API_KEY:
     raise RuntimeError("Please set DEEPGRAM_API_KEY environment variable.")
 
-DEEPGRAM_URL = (
+# Per DEEPGRAM_URL überschreibbar, z.B. für einen lokalen Mock-Server
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", (
     "wss://api.deepgram.com/v1/listen"
     "?encoding=mulaw"
     "&sample_rate=8000"
@@ -20,79 +28,45 @@ DEEPGRAM_URL = (
     "&diarize=true"
     "&punctuate=true"
     "&model=nova-2"
-)
+))
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
 
-# Lade echtes Modell
-anti_spoofing_model = load_model()
-anti_spoofing_model.to(device)
-anti_spoofing_model.eval()
+def deepgram_connect():
+    return websockets.connect(DEEPGRAM_URL, subprotocols=["token", DEEPGRAM_API_KEY])
 
-resampler = torchaudio.transforms.Resample(orig_freq=8000, new_freq=16000).to(device)
 
-def resample_audio(audio_chunk):
-    audio_np = np.frombuffer(audio_chunk, dtype=np.uint8).astype(np.float32) - 128
-    audio_tensor = torch.from_numpy(audio_np).to(device)
+# Vorverbundene Listen-Sessions (Konfiguration steckt in der URL, daher kein Setup)
+deepgram_pool = UpstreamPool(deepgram_connect, name="deepgram-listen")
 
-    audio_resampled = resampler(audio_tensor)
-    audio_resampled /= torch.max(torch.abs(audio_resampled)) + 1e-9
-    return audio_resampled
+# Wie in server.py: Resampling + Inferenz außerhalb des Eventloops, Fenster aller Clients gemeinsam gebatcht
+EXECUTION_MODE = os.getenv("SPOOF_EXECUTION_MODE", "thread")
+POOL_SIZE = int(os.getenv("SPOOF_POOL_SIZE", "2"))
+TORCH_THREADS = int(os.getenv("SPOOF_TORCH_THREADS", "0")) or None
+pool = InferencePool(POOL_SIZE, TORCH_THREADS) if EXECUTION_MODE == "thread" else None
 
-async def anti_spoofing_worker(audio_queue, spoof_results_queue):
-    print("Anti-spoofing worker started.")
-    SPOOFING_WINDOW_SIZE_SAMPLES = 16000 * 2  # 2 Sekunden Fenster
-    spoofing_buffer = []
-
-    while True:
-        chunk = await audio_queue.get()
-        if chunk is None:
-            break
-
-        resampled_chunk = resample_audio(chunk)
-        spoofing_buffer.append(resampled_chunk)
-
-        current_buffer_size = sum(c.size(0) for c in spoofing_buffer)
-        if current_buffer_size >= SPOOFING_WINDOW_SIZE_SAMPLES:
-
-            print(f"resampled_chunk shape: {resampled_chunk.shape}")
-            print(f"buffer elements shapes before cat: {[c.shape for c in spoofing_buffer]}")
-
-            audio_tensor = torch.cat(spoofing_buffer, dim=0)  # Shape: [32000]
-            print(f"audio_tensor shape after cat: {audio_tensor.shape}")
-
-            audio_window = audio_tensor.view(1, 1, -1)  # Shape: [1, 1, 32000]
-            print(f"audio_window shape after reshape: {audio_window.shape}")
-
-            audio_window = torch.cat(spoofing_buffer, dim=0).unsqueeze(0)  # Batch-Dim hinzufügen
-            with torch.no_grad():
-                print("calling anti-spoofing model...")
-                output = anti_spoofing_model(audio_window)
-                print(f"Model output type: {type(output)}")
-                print(f"Model output: {output}")
-                if isinstance(output, tuple):
-                    print(f"Output is a tuple with {len(output)} elements:")
-                    for i, elem in enumerate(output):
-                        print(f"Element {i} type: {type(elem)}, value: {elem}, shape: {elem.shape if hasattr(elem, 'shape') else 'N/A'}")
-                score = output[0].item() if isinstance(output, tuple) else output.item()  # Vorläufige Annahme
-                print(f"Extracted score: {score}")
-                await spoof_results_queue.put(score)
-            spoofing_buffer = []
-
-        audio_queue.task_done()
-    print("Anti-spoofing worker finished.")
+MAX_BATCH_SIZE = int(os.getenv("SPOOF_MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("SPOOF_MAX_WAIT_MS", "20"))
+scheduler = None  # wird beim Start erstellt, sobald das Modell geladen ist
 
 
 async def relay_to_deepgram(websocket_client):
     print("Connecting to Deepgram ...")
 
-    audio_queue = asyncio.Queue()
-    spoof_results_queue = asyncio.Queue()
+    queue_counters = {}
+    audio_queue = BoundedQueue(AUDIO_QUEUE_SIZE, OVERFLOW_POLICY, "audio", queue_counters)
+    spoof_results_queue = BoundedQueue(RESULTS_QUEUE_SIZE, RESULTS_OVERFLOW_POLICY, "results", queue_counters)
+    # Scores nach Stream-Zeit, damit ein Transkript die Scores seiner eigenen Audiospanne bekommt
+    timeline = ScoreTimeline()
+    # Betrugsphrasen lokal matchen, schon in den Partials
+    keywords = new_stream()
+
+    async def send_to_client(message):
+        await websocket_client.send(json.dumps(message))
+
+    # Partials gedrosselt und als Delta (keep/append), Finals komplett
+    coalescer = TranscriptCoalescer(send_to_client)
 
-    async with websockets.connect(
-            DEEPGRAM_URL,
-            subprotocols=["token", DEEPGRAM_API_KEY]
-    ) as dg_ws:
+    async with deepgram_pool.session() as dg_ws:
         print("Connected to Deepgram!")
 
         async def receive_transcription():
@@ -103,54 +77,77 @@ async def relay_to_deepgram(websocket_client):
                     if result.get("type") == "PartialTranscript":
                         transcript = result["channel"]["alternatives"][0]["transcript"]
                         speaker = result["channel"]["alternatives"][0].get("speakers", [{}])[0].get("label", "Unknown")
-                        await websocket_client.send(
-                            json.dumps({
-                                "transcript": transcript,
-                                "speaker": speaker,
-                                "is_final": False,
-                                "is_spoof": False
-                            })
+                        with timed("keyword_match"):
+                            hits = keywords.feed(transcript)
+                        if hits:
+                            print(f"Keywords in partial: {hits} (content score {keywords.total_weight:.1f})")
+                        await coalescer.partial(
+                            transcript,
+                            speaker=speaker,
+                            is_spoof=False,
+                            keywords=[phrase for phrase, _ in hits],
+                            content_score=keywords.total_weight
                         )
                     elif result.get("type") == "FinalTranscript":
                         transcript = result["channel"]["alternatives"][0]["transcript"]
                         speaker = result["channel"]["alternatives"][0].get("speakers", [{}])[0].get("label", "Unknown")
 
-                        # Spoofing Score abfragen (non-blocking)
-                        spoof_score = None
+                        with timed("keyword_match"):
+                            hits = keywords.feed(transcript, is_final=True)
+
+                        # Scores der Fenster, die die Äußerung überlappen (start/duration in Stream-Sekunden)
+                        start = result.get("start", 0.0)
+                        end = start + result.get("duration", 0.0)
+                        spoof_score = timeline.max_score(start, end)
                         is_spoof = False
-                        try:
-                            spoof_score = spoof_results_queue.get_nowait()
+                        if spoof_score is not None:
                             if spoof_score > 0.8:  # Threshold anpassen
                                 is_spoof = True
                             print(f"Final Transcript: {transcript} (Speaker: {speaker}) - Spoof Score: {spoof_score:.3f}, Is Spoof: {is_spoof}")
-                        except asyncio.QueueEmpty:
+                        else:
                             print(f"Final Transcript: {transcript} (Speaker: {speaker}) - No spoofing score available.")
 
-                        await websocket_client.send(
-                            json.dumps({
-                                "transcript": transcript,
-                                "speaker": speaker,
-                                "is_final": True,
-                                "is_spoof": is_spoof
-                            })
+                        await coalescer.final(
+                            transcript,
+                            speaker=speaker,
+                            is_spoof=is_spoof,
+                            keywords=[phrase for phrase, _ in hits],
+                            content_score=keywords.total_weight
                         )
                 except Exception as e:
                     print(f"Error processing Deepgram result: {e}")
 
         async def forward_audio():
+            stream_offset = 0  # Bytes seit Streamstart
             try:
                 async for message in websocket_client:
-                    await audio_queue.put(message)  # Für Spoofing Worker
+                    await audio_queue.put((stream_offset, message))  # Für Spoofing Worker
+                    stream_offset += len(message)
                     await dg_ws.send(message)       # An Deepgram weiterleiten
             except websockets.exceptions.ConnectionClosed:
                 print("Client disconnected.")
                 await audio_queue.put(None)  # Signal Ende Stream
 
+        async def run_anti_spoofing():
+            await anti_spoofing_worker(audio_queue, spoof_results_queue, get_model(), scheduler, pool)
+            await spoof_results_queue.put(None)  # Ende für collect_scores
+
+        async def collect_scores():
+            while True:
+                result = await spoof_results_queue.get()
+                if result is None:
+                    break
+                timeline.add_result(result)
+
         await asyncio.gather(
             forward_audio(),
             receive_transcription(),
-            anti_spoofing_worker(audio_queue, spoof_results_queue)
+            run_anti_spoofing(),
+            collect_scores(),
         )
+        coalescer.close()
+        print(f"Queue counters for this client: {queue_counters}")
+        print(f"Partials: {coalescer.partials_in} from Deepgram, {coalescer.partials_out} sent")
 
 
 async def handler(websocket, path):
@@ -162,7 +159,12 @@ async def handler(websocket, path):
 
 
 if __name__ == "__main__":
+    # Modell einmal vor dem ersten Client laden und aufwärmen (model_loader cached es)
+    model = get_model()
+    if MAX_BATCH_SIZE > 1:
+        scheduler = InferenceScheduler(model, MAX_BATCH_SIZE, MAX_WAIT_MS, pool)
     start_server = websockets.serve(handler, "localhost", 5000)
     print("Server listening on ws://localhost:5000")
     asyncio.get_event_loop().run_until_complete(start_server)
+    asyncio.get_event_loop().run_until_complete(deepgram_pool.start())
     asyncio.get_event_loop().run_forever()
@@ -6,13 +6,23 @@ import websockets
 import ssl
 import os
 import datetime
+from urllib.parse import urlsplit
+
+# Shared modules from lib/ (AudioChunker, ...)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+from chunker import AudioChunker
+from twilio_frames import TwilioFrameDecoder
+from alert_broadcaster import AlertBroadcaster, client_handler
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
-# Global queue to send fraud alerts to frontend clients
-FRAUD_ALERT_QUEUE = asyncio.Queue()
+# Fans fraud alerts out to every connected frontend client (optionally filtered by call_sid)
+FRAUD_ALERTS = AlertBroadcaster()
+
+# Stateless Twilio frame parser shared by all calls
+frame_decoder = TwilioFrameDecoder()
 
 def sts_connect():
     api_key = os.getenv('DEEPGRAM_API_KEY')
@@ -97,7 +107,9 @@ async def twilio_handler(twilio_ws):
 
         async def sts_receiver(sts_ws):
             print("sts_receiver started")
-            streamsid = await streamsid_queue.get()
+            start = await streamsid_queue.get()
+            streamsid = start["streamSid"]
+            call_sid = start.get("callSid")
 
             async for message in sts_ws:
                 if isinstance(message, str):
@@ -119,6 +131,7 @@ async def twilio_handler(twilio_ws):
 
                             alert = {
                                 "event": "fraud_update",
+                                "call_sid": call_sid,
                                 "is_fraudulent": is_fraud,
                                 "fraud_type": fraud_type,
                                 "confidence": confidence,
@@ -126,8 +139,8 @@ async def twilio_handler(twilio_ws):
                                 "timestamp": datetime.datetime.now().isoformat()
                             }
 
-                            # Send to frontend
-                            await FRAUD_ALERT_QUEUE.put(alert)
+                            # Send to frontend (non-blocking, slow clients get dropped)
+                            FRAUD_ALERTS.publish(alert)
 
                             # Log
                             if is_fraud:
@@ -152,30 +165,25 @@ async def twilio_handler(twilio_ws):
         async def twilio_receiver(twilio_ws):
             print("twilio_receiver started")
             BUFFER_SIZE = 20 * 160  # 0.4 seconds
-            inbuffer = bytearray(b"")
+            chunker = AudioChunker(BUFFER_SIZE)
 
             async for message in twilio_ws:
                 try:
-                    data = json.loads(message)
-                    if data["event"] == "start":
+                    event, data, audio = frame_decoder.decode(message)
+                    if event == "media":
+                        # Flush fixed-size inbound chunks to Deepgram
+                        if audio is not None:
+                            for chunk in chunker.feed(audio):
+                                audio_queue.put_nowait(chunk)
+                    elif event == "start":
                         print("Received start event, streamSid:", data["start"]["streamSid"])
-                        streamsid_queue.put_nowait(data["start"]["streamSid"])
-                    elif data["event"] == "connected":
+                        streamsid_queue.put_nowait(data["start"])
+                    elif event == "connected":
                         continue
-                    elif data["event"] == "media":
-                        payload = base64.b64decode(data["media"]["payload"])
-                        if data["media"]["track"] == "inbound":
-                            inbuffer.extend(payload)
-                    elif data["event"] == "stop":
+                    elif event == "stop":
                         print("Call stopped.")
                         break
 
-                    # Flush buffer to Deepgram
-                    while len(inbuffer) >= BUFFER_SIZE:
-                        chunk = inbuffer[:BUFFER_SIZE]
-                        audio_queue.put_nowait(chunk)
-                        inbuffer = inbuffer[BUFFER_SIZE:]
-
                 except Exception as e:
                     print("Error in twilio_receiver:", e)
                     break
@@ -192,22 +200,13 @@ async def twilio_handler(twilio_ws):
 
         await twilio_ws.close()
 
-async def client_handler(websocket: websockets.WebSocketServerProtocol):
-    """Handles connections from the frontend UI"""
-    print("Frontend client connected")
-    try:
-        while True:
-            alert = await FRAUD_ALERT_QUEUE.get()
-            await websocket.send(json.dumps(alert))
-    except websockets.exceptions.ConnectionClosed:
-        print("Frontend client disconnected")
-
 async def router(websocket, path):
     print(f"Incoming connection on path: {path}")
-    if path == "/twilio":
+    url = urlsplit(path)
+    if url.path == "/twilio":
         await twilio_handler(websocket)
-    elif path == "/client":
-        await client_handler(websocket)
+    elif url.path == "/client":
+        await client_handler(websocket, FRAUD_ALERTS, url.query)
     else:
         print(f"Unknown path: {path}")
         await websocket.close()
@@ -1,5 +1,4 @@
 // call.js
-const wsUrl = "ws://localhost:5000/client";
 let socket;
 let callTimer;
 
@@ -7,6 +6,11 @@ let callTimer;
 const urlParams = new URLSearchParams(window.location.search);
 const callSid = urlParams.get('call_sid');
 
+// Server filters by call_sid, so only this call's events are sent
+const alertEncoding = typeof decodeMsgpack === "function" ? "msgpack" : "json";
+const wsUrl = `ws://localhost:5000/client?call_sid=${encodeURIComponent(callSid || "")}` +
+  `&batch_ms=100&encoding=${alertEncoding}`;
+
 // Elements
 const statusBadge = document.getElementById("statusBadge");
 const reasoningEl = document.getElementById("reasoning");
@@ -36,6 +40,7 @@ callTimer = setInterval(() => {
 
 function connect() {
   socket = new WebSocket(wsUrl);
+  socket.binaryType = "arraybuffer";
 
   socket.onopen = () => {
     statusBadge.textContent = "Live";
@@ -43,16 +48,19 @@ function connect() {
   };
 
   socket.onmessage = (event) => {
-    const data = JSON.parse(event.data);
-    
-    // Only process events for this call
-    if (data.call_sid !== callSid) return;
-    
-    if (data.event === "fraud_update") {
-      processFraudUpdate(data);
-    }
-    else if (data.event === "call_ended") {
-      endCall();
+    for (const data of readAlerts(event.data)) {
+      // Server-side filter already applies; keep the check as a safeguard
+      if (data.event !== "snapshot" && data.call_sid !== callSid) continue;
+      
+      if (data.event === "snapshot") {
+        applySnapshot(data.calls);
+      }
+      else if (data.event === "fraud_update") {
+        processFraudUpdate(data);
+      }
+      else if (data.event === "call_ended") {
+        endCall();
+      }
     }
   };
 
@@ -67,6 +75,29 @@ function connect() {
   };
 }
 
+// Alerts arrive batched (one frame per 100ms), binary if msgpack.js is loaded
+function readAlerts(data) {
+  if (typeof decodeAlertFrame === "function") return decodeAlertFrame(data);
+  const frame = JSON.parse(data);
+  return frame.event === "batch" ? frame.alerts : [frame];
+}
+
+// Rebuild this call's view from the server state (on connect and after every reconnect)
+function applySnapshot(calls) {
+  const call = calls.find(c => c.call_sid === callSid);
+  if (!call) return;
+  
+  startTime.setTime(Date.parse(call.start_time));
+  startTimeEl.textContent = startTime.toLocaleTimeString();
+  callSeconds = Math.floor((Date.now() - startTime) / 1000);
+  
+  transcriptLog.innerHTML = "";
+  call.alerts
+    .filter(alert => alert.event === "fraud_update")
+    .forEach(processFraudUpdate);
+  if (call.ended) endCall();
+}
+
 function processFraudUpdate(data) {
   reasoningEl.textContent = `${data.reasoning} [${data.confidence}]`;
   
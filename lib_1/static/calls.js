@@ -1,5 +1,6 @@
 // calls.js
-const wsUrl = "ws://localhost:5000/client";
+const alertEncoding = typeof decodeMsgpack === "function" ? "msgpack" : "json";
+const wsUrl = `ws://localhost:5000/client?batch_ms=100&encoding=${alertEncoding}`;
 let socket;
 const callsContainer = document.getElementById("callsContainer");
 const emptyState = document.getElementById("emptyState");
@@ -11,6 +12,7 @@ const activeCalls = new Map();
 
 function connect() {
   socket = new WebSocket(wsUrl);
+  socket.binaryType = "arraybuffer";
 
   socket.onopen = () => {
     console.log("Connected to backend");
@@ -21,20 +23,24 @@ function connect() {
   };
 
   socket.onmessage = (event) => {
-    const data = JSON.parse(event.data);
-    
-    switch(data.event) {
-      case "call_started":
-        addCallCard(data);
-        break;
-        
-      case "fraud_update":
-        updateCallCard(data);
-        break;
-        
-      case "call_ended":
-        endCall(data.call_sid);
-        break;
+    for (const data of readAlerts(event.data)) {
+      switch(data.event) {
+        case "snapshot":
+          applySnapshot(data.calls);
+          break;
+          
+        case "call_started":
+          addCallCard(data);
+          break;
+          
+        case "fraud_update":
+          updateCallCard(data);
+          break;
+          
+        case "call_ended":
+          endCall(data.call_sid);
+          break;
+      }
     }
     
     updateCallCount();
@@ -54,6 +60,23 @@ function connect() {
   };
 }
 
+// Alerts arrive batched (one frame per 100ms), binary if msgpack.js is loaded
+function readAlerts(data) {
+  if (typeof decodeAlertFrame === "function") return decodeAlertFrame(data);
+  const frame = JSON.parse(data);
+  return frame.event === "batch" ? frame.alerts : [frame];
+}
+
+// Rebuild the cards from the server state (on connect and after every reconnect)
+function applySnapshot(calls) {
+  calls.forEach(call => {
+    if (call.ended && !activeCalls.has(call.call_sid)) return;  // finished before we connected
+    if (!activeCalls.has(call.call_sid)) addCallCard(call);
+    if (call.reasoning !== undefined) updateCallCard(call);
+    if (call.ended) endCall(call.call_sid);
+  });
+}
+
 function addCallCard(callData) {
   emptyState.classList.add("hidden");
   
@@ -68,7 +91,7 @@ function addCallCard(callData) {
             <span class="status-indicator h-3 w-3 rounded-full bg-gray-500 mr-2"></span>
             <span class="status-text text-sm font-medium">Connecting...</span>
           </div>
-          <h3 class="text-xl font-semibold">${callData.caller}</h3>
+          <h3 class="text-xl font-semibold">${callData.caller || "Unknown caller"}</h3>
           <p class="text-gray-500 text-sm">${formatTime(callData.start_time)}</p>
         </div>
         <button class="view-call-btn p-2 text-blue-600 hover:bg-blue-50 rounded-full" 
@@ -24,14 +24,30 @@ import websockets
 import ssl
 import os
 import datetime
+import time
 import threading
+import multiprocessing
+from urllib.parse import urlsplit
 import pprint as p
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from twilio.jwt.access_token import AccessToken
 from twilio.jwt.access_token.grants import VoiceGrant
 from twilio.twiml.voice_response import VoiceResponse, Dial
 
+# Shared streaming helpers live in ../lib (AudioChunker, ...)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+from chunker import AudioChunker
+from twilio_frames import TwilioFrameDecoder
+from bounded_queue import BoundedQueue, DROP_OLDEST, AUDIO_QUEUE_SIZE, OVERFLOW_POLICY
+from alert_broadcaster import AlertBroadcaster, client_handler
+from alert_bus import AlertBus
+from upstream_pool import UpstreamPool
+from call_recorder import RECORDER
+from keyword_matcher import new_stream, keyword_alert
+import metrics
+from metrics import active_call, observe, timed
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -91,10 +107,82 @@ def handle_calls():
     # return TwiML
     return str(response)
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Prometheus text format: per-stage latency histograms + call/queue gauges.
+    # With FRAUD_WS_WORKERS > 1 the calls run in worker processes, so this only covers Flask's process.
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 # ---- Fraud detection WebSocket server (mostly server.py) ----
 
-# Global queue to send fraud alerts to frontend clients
-FRAUD_ALERT_QUEUE = None  
+# Fans fraud alerts out to every connected frontend client (optionally filtered by call_sid).
+# In multi-worker mode each worker replaces this with an AlertBus (see start_fraud_server).
+FRAUD_ALERTS = AlertBroadcaster()
+
+# Number of websocket worker processes sharing port 5000 via SO_REUSEPORT.
+# 1 = single event loop in a thread next to Flask (original behaviour).
+FRAUD_WS_WORKERS = int(os.getenv("FRAUD_WS_WORKERS", "1"))
+
+# Stateless Twilio frame parser (orjson + media fast path when available), shared by all calls
+frame_decoder = TwilioFrameDecoder()
+
+# Upstream agent endpoint; point it at a local mock server for testing
+DEEPGRAM_AGENT_URL = os.getenv("DEEPGRAM_AGENT_URL", "wss://agent.deepgram.com/v1/agent/converse")
+
+# Deepgram Agent configuration (kept from original), sent once per upstream session
+AGENT_SETTINGS = {
+    "type": "Settings",
+    "audio": {
+        "input": {
+            "encoding": "mulaw",
+            "sample_rate": 8000,
+        },
+        "output": {
+            "encoding": "mulaw",
+            "sample_rate": 8000,
+            "container": "none",
+        },
+    },
+    "agent": {
+        "language": "en",
+        "listen": {
+            "provider": {
+                "type": "deepgram",
+                "model": "nova-3",
+                "keyterms": ["urgent", "password", "verify", "social security", "transfer"]
+            }
+        },
+        "think": {
+            "provider": {
+                "type": "open_ai",
+                "model": "gpt-4o-mini",
+                "temperature": 0.7
+            },
+            "prompt": (
+                "You are a silent fraud detection assistant for a live phone call. "
+                "Your task is to analyze the user's speech for signs of fraud. "
+                "Evaluate two things:\n"
+                "1. **Content Fraud**: Scam tactics like urgency, requesting sensitive info, impersonation.\n"
+                "2. **Vocal Anomalies**: Unnatural pacing, monotone, robotic tone, lack of emotion.\n\n"
+                "Respond ONLY with a JSON object:\n"
+                "{\n"
+                '  \"is_fraudulent\": boolean,\n'
+                '  \"fraud_type\": \"content\" | \"vocal\" | \"none\" | \"both\",\n'
+                '  \"confidence\": \"low\" | \"medium\" | \"high\",\n'
+                '  \"reasoning\": \"Brief explanation.\"\n'
+                "}\n"
+                "If no fraud, set is_fraudulent=false, fraud_type='none'."
+            )
+        },
+        "speak": {
+            "provider": {
+                "type": "deepgram",
+                "model": "aura-2-thalia-en"
+            }
+        },
+        "greeting": ""
+    }
+}
 
 def sts_connect():
     api_key = os.getenv('DEEPGRAM_API_KEY')
@@ -103,79 +191,36 @@ def sts_connect():
 
     # This mirrors your original: subprotocols list contains token and key
     sts_ws = websockets.connect(
-        "wss://agent.deepgram.com/v1/agent/converse",
+        DEEPGRAM_AGENT_URL,
         subprotocols=["token", api_key]
     )
     return sts_ws
 
+async def sts_setup(sts_ws):
+    await sts_ws.send(json.dumps(AGENT_SETTINGS))
+
+# Pre-connected, pre-configured agent sessions; created per event loop in start_fraud_server
+STS_POOL = None
+
+metrics.REGISTRY.gauge("fraud_alert_subscribers", lambda: FRAUD_ALERTS.subscriber_count,
+                       "Connected /client dashboards")
+metrics.REGISTRY.gauge("fraud_upstream_pool_idle", lambda: STS_POOL.stats()["idle"] if STS_POOL else 0,
+                       "Warm Deepgram agent sessions waiting in the pool")
+
 async def twilio_handler(twilio_ws: websockets.WebSocketServerProtocol):
     """
     Handles a Twilio media stream connection.
     Sends audio chunks to Deepgram agent and receives:
-      - assistant (fraud analysis JSON) -> convert into alert -> push to FRAUD_ALERT_QUEUE
+      - assistant (fraud analysis JSON) -> convert into alert -> publish to FRAUD_ALERTS
       - TTS audio from Deepgram -> send back as Twilio media messages
     """
-    audio_queue = asyncio.Queue()
-    streamsid_queue = asyncio.Queue()
-
-    async with sts_connect() as sts_ws:
-        # Send Deepgram Agent configuration (kept from original)
-        config_message = {
-            "type": "Settings",
-            "audio": {
-                "input": {
-                    "encoding": "mulaw",
-                    "sample_rate": 8000,
-                },
-                "output": {
-                    "encoding": "mulaw",
-                    "sample_rate": 8000,
-                    "container": "none",
-                },
-            },
-            "agent": {
-                "language": "en",
-                "listen": {
-                    "provider": {
-                        "type": "deepgram",
-                        "model": "nova-3",
-                        "keyterms": ["urgent", "password", "verify", "social security", "transfer"]
-                    }
-                },
-                "think": {
-                    "provider": {
-                        "type": "open_ai",
-                        "model": "gpt-4o-mini",
-                        "temperature": 0.7
-                    },
-                    "prompt": (
-                        "You are a silent fraud detection assistant for a live phone call. "
-                        "Your task is to analyze the user's speech for signs of fraud. "
-                        "Evaluate two things:\n"
-                        "1. **Content Fraud**: Scam tactics like urgency, requesting sensitive info, impersonation.\n"
-                        "2. **Vocal Anomalies**: Unnatural pacing, monotone, robotic tone, lack of emotion.\n\n"
-                        "Respond ONLY with a JSON object:\n"
-                        "{\n"
-                        '  \"is_fraudulent\": boolean,\n'
-                        '  \"fraud_type\": \"content\" | \"vocal\" | \"none\" | \"both\",\n'
-                        '  \"confidence\": \"low\" | \"medium\" | \"high\",\n'
-                        '  \"reasoning\": \"Brief explanation.\"\n'
-                        "}\n"
-                        "If no fraud, set is_fraudulent=false, fraud_type='none'."
-                    )
-                },
-                "speak": {
-                    "provider": {
-                        "type": "deepgram",
-                        "model": "aura-2-thalia-en"
-                    }
-                },
-                "greeting": ""
-            }
-        }
-
-        await sts_ws.send(json.dumps(config_message))
+    # Bounded per-call queues; dropped items are counted in queue_counters
+    queue_counters = {}
+    audio_queue = BoundedQueue(AUDIO_QUEUE_SIZE, OVERFLOW_POLICY, "audio", queue_counters)
+    streamsid_queue = BoundedQueue(1, DROP_OLDEST, "streamsid", queue_counters)
+    call = {"call_sid": None}  # set from the Twilio start event, used for call_ended
 
+    async with STS_POOL.session() as sts_ws:
         async def sts_sender(sts_ws):
             print("sts_sender started")
             while True:
@@ -187,13 +232,24 @@ async def twilio_handler(twilio_ws: websockets.WebSocketServerProtocol):
 
         async def sts_receiver(sts_ws):
             print("sts_receiver started")
-            streamsid = await streamsid_queue.get()
+            start = await streamsid_queue.get()
+            streamsid = start["streamSid"]
+            call_sid = start.get("callSid")
+            keywords = new_stream()  # local content scoring, no LLM round trip
 
             async for message in sts_ws:
                 if isinstance(message, str):
                     # text message from Deepgram agent
                     decoded = json.loads(message)
-                    if decoded.get('type') == 'UserStartedSpeaking':
+                    if decoded.get('type') == 'ConversationText' and decoded.get('role') == 'user':
+                        with timed("keyword_match"):
+                            hits = keywords.feed(decoded.get('content', ''), is_final=True)
+                        alert = keyword_alert(keywords, hits, call_sid)
+                        if alert is not None:
+                            alert["timestamp"] = datetime.datetime.now().isoformat()
+                            FRAUD_ALERTS.publish(alert)
+                            print(f"🚨 KEYWORD ALERT [{alert['confidence'].upper()}]: {alert['reasoning']}")
+                    elif decoded.get('type') == 'UserStartedSpeaking':
                         clear_message = {
                             "event": "clear",
                             "streamSid": streamsid
@@ -210,6 +266,7 @@ async def twilio_handler(twilio_ws: websockets.WebSocketServerProtocol):
 
                             alert = {
                                 "event": "fraud_update",
+                                "call_sid": call_sid,
                                 "is_fraudulent": is_fraud,
                                 "fraud_type": fraud_type,
                                 "confidence": confidence,
@@ -217,8 +274,8 @@ async def twilio_handler(twilio_ws: websockets.WebSocketServerProtocol):
                                 "timestamp": datetime.datetime.now().isoformat()
                             }
 
-                            # Send to frontend
-                            await FRAUD_ALERT_QUEUE.put(alert)
+                            # Send to frontend (non-blocking, slow clients get dropped)
+                            FRAUD_ALERTS.publish(alert)
 
                             # Log
                             if is_fraud:
@@ -243,34 +300,46 @@ async def twilio_handler(twilio_ws: websockets.WebSocketServerProtocol):
         async def twilio_receiver(twilio_ws):
             print("twilio_receiver started")
             BUFFER_SIZE = 20 * 160  # 0.4 seconds
-            inbuffer = bytearray(b"")
+            chunker = AudioChunker(BUFFER_SIZE)
+            recording = None  # optional raw inbound recording (CALL_RECORDING_DIR)
 
             async for message in twilio_ws:
                 try:
-                    data = json.loads(message)
-                    if data.get("event") == "start":
+                    parse_start = time.perf_counter()
+                    event, data, audio = frame_decoder.decode(message)
+                    observe("frame_parse", time.perf_counter() - parse_start)
+                    if event == "media":
+                        # Flush inbound audio to Deepgram in consistent chunks
+                        if audio is not None:
+                            for chunk in chunker.feed(audio):
+                                if recording is not None:
+                                    recording.append(chunk)
+                                await audio_queue.put(chunk)
+                    elif event == "start":
                         print("Received start event, streamSid:", data["start"]["streamSid"])
-                        await streamsid_queue.put(data["start"]["streamSid"])
-                    elif data.get("event") == "connected":
+                        await streamsid_queue.put(data["start"])
+                        call["call_sid"] = data["start"].get("callSid")
+                        # Lets dashboards (and their snapshots) know about the call before the first analysis
+                        FRAUD_ALERTS.publish({
+                            "event": "call_started",
+                            "call_sid": call["call_sid"],
+                            "caller": data["start"].get("customParameters", {}).get("caller"),
+                            "start_time": datetime.datetime.now().isoformat()
+                        })
+                        if RECORDER is not None:
+                            recording = RECORDER.open_call(data["start"].get("callSid") or data["start"]["streamSid"])
+                    elif event == "connected":
                         continue
-                    elif data.get("event") == "media":
-                        payload = base64.b64decode(data["media"]["payload"])
-                        if data["media"].get("track") == "inbound":
-                            inbuffer.extend(payload)
-                    elif data.get("event") == "stop":
+                    elif event == "stop":
                         print("Call stopped.")
                         break
 
-                    # Flush buffer to Deepgram in consistent chunks
-                    while len(inbuffer) >= BUFFER_SIZE:
-                        chunk = bytes(inbuffer[:BUFFER_SIZE])
-                        await audio_queue.put(chunk)
-                        inbuffer = inbuffer[BUFFER_SIZE:]
-
                 except Exception as e:
                     print("Error in twilio_receiver:", e)
                     break
 
+            if recording is not None:
+                recording.close()
             # Signal end
             await audio_queue.put(b'')
 
@@ -281,58 +350,91 @@ async def twilio_handler(twilio_ws: websockets.WebSocketServerProtocol):
             twilio_receiver(twilio_ws)
         )
 
+        if call["call_sid"] is not None:
+            FRAUD_ALERTS.publish({
+                "event": "call_ended",
+                "call_sid": call["call_sid"],
+                "timestamp": datetime.datetime.now().isoformat()
+            })
+        print(f"Queue counters for this call: {queue_counters}")
         await twilio_ws.close()
 
-async def client_handler(websocket: websockets.WebSocketServerProtocol):
-    """Handles connections from the frontend UI, pushing fraud alerts from the shared queue."""
-    print("Frontend client connected")
-    try:
-        while True:
-            alert = await FRAUD_ALERT_QUEUE.get()
-            await websocket.send(json.dumps(alert))
-    except websockets.exceptions.ConnectionClosed:
-        print("Frontend client disconnected")
-
 async def router(websocket: websockets.WebSocketServerProtocol, path: str):
     """
     Route connections based on path:
       - /twilio -> twilio_handler
-      - /client -> client_handler
+      - /client[?call_sid=CA...] -> client_handler (all calls without call_sid)
     """
     print(f"Incoming connection on path: {path}")
-    if path == "/twilio":
-        await twilio_handler(websocket)
-    elif path == "/client":
-        await client_handler(websocket)
+    url = urlsplit(path)
+    if url.path == "/twilio":
+        with active_call():
+            await twilio_handler(websocket)
+    elif url.path == "/client":
+        await client_handler(websocket, FRAUD_ALERTS, url.query)
     else:
         print(f"Unknown path: {path}")
         await websocket.close()
 
-def start_fraud_server(host="0.0.0.0", port=5000):
+def start_fraud_server(host="0.0.0.0", port=5000, worker_id=None, num_workers=1):
     """
     Starts the async websockets server in a fresh asyncio loop.
-    This function is meant to run in a dedicated thread.
+    This function is meant to run in a dedicated thread, or as the target of a
+    worker process when num_workers > 1 (all workers bind the same port with
+    SO_REUSEPORT and share alerts over an AlertBus).
     """
-    global FRAUD_ALERT_QUEUE
+    global FRAUD_ALERTS, STS_POOL
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    FRAUD_ALERT_QUEUE = asyncio.Queue()
-    print(f"Starting fraud websocket server on ws://{host}:{port}")
+    STS_POOL = UpstreamPool(sts_connect, sts_setup, name="deepgram-agent")
+    serve_kwargs = {}
+    if num_workers > 1:
+        serve_kwargs["reuse_port"] = True
+        FRAUD_ALERTS = AlertBus(worker_id, num_workers)
+        loop.call_soon(FRAUD_ALERTS.start)
+        print(f"Starting fraud websocket worker {worker_id}/{num_workers} on ws://{host}:{port} (pid {os.getpid()})")
+    else:
+        print(f"Starting fraud websocket server on ws://{host}:{port}")
     # For production with SSL, create ssl_context and pass ssl=ssl_context to serve()
-    server_coroutine = websockets.serve(router, host, port)
+    server_coroutine = websockets.serve(router, host, port, **serve_kwargs)
     server = loop.run_until_complete(server_coroutine)
+    loop.run_until_complete(STS_POOL.start())
     try:
         loop.run_forever()
+    except KeyboardInterrupt:
+        pass
     finally:
+        if isinstance(FRAUD_ALERTS, AlertBus):
+            FRAUD_ALERTS.close()
         server.close()
         loop.run_until_complete(server.wait_closed())
+        loop.run_until_complete(STS_POOL.stop())
         loop.close()
 
+def start_fraud_workers(host="0.0.0.0", port=5000, num_workers=FRAUD_WS_WORKERS):
+    """Starts num_workers websocket server processes on the same port. Returns the processes."""
+    workers = []
+    for worker_id in range(num_workers):
+        proc = multiprocessing.Process(
+            target=start_fraud_server,
+            kwargs={"host": host, "port": port, "worker_id": worker_id, "num_workers": num_workers},
+            name=f"fraud-ws-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+        workers.append(proc)
+    return workers
+
 # ---- Entrypoint ----
 if __name__ == "__main__":
-    # Run the fraud server in a daemon thread so it shuts down with the main process.
-    # Use use_reloader=False to avoid starting twice during Flask debug reloader.
-    ws_thread = threading.Thread(target=start_fraud_server, kwargs={"host": "0.0.0.0", "port": 5000}, daemon=True)
-    ws_thread.start()
+    if FRAUD_WS_WORKERS > 1:
+        # N worker processes (own event loop each) accept on port 5000; started
+        # before Flask so no threads exist at fork time. Daemon processes exit with Flask.
+        start_fraud_workers("0.0.0.0", 5000, FRAUD_WS_WORKERS)
+    else:
+        # Run the fraud server in a daemon thread so it shuts down with the main process.
+        # Use use_reloader=False to avoid starting twice during Flask debug reloader.
+        ws_thread = threading.Thread(target=start_fraud_server, kwargs={"host": "0.0.0.0", "port": 5000}, daemon=True)
+        ws_thread.start()
     # Start Flask. If you want reloader, ensure you handle double-start issues.
     app.run(host='0.0.0.0', port=3000, debug=True, use_reloader=False)
@@ -27,7 +27,21 @@ $(function () {
             };
             
             fraudSocket.onmessage = function(event) {
-                const alert = JSON.parse(event.data);
+                const data = JSON.parse(event.data);
+                
+                // First message is a snapshot of known calls: replay their recent alerts (silently)
+                if (data.event === "snapshot") {
+                    data.calls.forEach(function (call) {
+                        call.alerts.forEach(function (alert) { handleFraudAlert(alert, false); });
+                    });
+                    return;
+                }
+                handleFraudAlert(data, true);
+            };
+            
+            function handleFraudAlert(alert, live) {
+                // call_started / call_ended / spoof_score are for the dashboards
+                if (alert.event !== "fraud_update") return;
                 log("Received fraud alert: " + alert.reasoning);
                 
                 // Update fraud panel (from home.html)
@@ -41,10 +55,10 @@ $(function () {
                 }
                 
                 // Play alert sound for high confidence fraud
-                if (alert.is_fraudulent && alert.confidence === 'high') {
+                if (live && alert.is_fraudulent && alert.confidence === 'high') {
                     playAlertSound();
                 }
-            };
+            }
 
             // Setup Twilio.Device
             device = new Twilio.Device(data.token, {